@@ -1,14 +1,83 @@
+import time
+
+_import_started = time.perf_counter()
+
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .models import model
-from .database import engine
-from .routers import auth, feedback
+from .config import settings
+from .database import init_async_engine, dispose_engines
+from .routers import auth, feedback, diagnostics, metrics
+from .utils.email_service import email_service
+from .utils.password import password_hasher
+from .utils.email_outbox import email_dispatcher
+from .utils.message_counts import message_count_reconciler
+from .utils.availability import availability_filter_rebuilder
+from .utils.rate_limit import rate_limiter
+from .utils.feedback_batcher import feedback_batcher
+from .utils.notifications import notification_listener
+from .utils.metrics import MetricsMiddleware, event_loop_monitor
+from .utils.retention import message_maintenance_task
+from .utils.read_routing import replica_health_checker
+
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Schema changes are applied by the explicit migration step (python -m app.migrate), not at startup
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    boot_started = time.perf_counter()
+
+    # Clients are created here rather than at import; none of them connect until first use
+    init_async_engine()
+    email_service.start()
+    if settings.database_replica_urls:
+        replica_health_checker.start()
+
+    email_dispatcher.start()
+    message_count_reconciler.start()
+    message_maintenance_task.start()
+    availability_filter_rebuilder.start()
+    notification_listener.start()
+    if settings.metrics_enabled:
+        event_loop_monitor.start()
+    if settings.feedback_batching_enabled:
+        feedback_batcher.start()
+
+    app.state.startup_report = {
+        "import_ms": round(IMPORT_SECONDS * 1000, 2),
+        "boot_ms": round((time.perf_counter() - boot_started) * 1000, 2),
+    }
+    logger.info(f"Startup: imports {app.state.startup_report['import_ms']}ms, boot {app.state.startup_report['boot_ms']}ms")
+
+    yield
+
+    await event_loop_monitor.stop()
+    await notification_listener.stop()
+    await feedback_batcher.stop()
+    await availability_filter_rebuilder.stop()
+    await message_maintenance_task.stop()
+    await message_count_reconciler.stop()
+    await email_dispatcher.stop()
+    await email_service.stop()
+    password_hasher.shutdown()
+    await rate_limiter.close()
+    await replica_health_checker.stop()
+    await dispose_engines()
 
-model.Base.metadata.create_all(bind=engine)
+app = FastAPI(lifespan=lifespan)
 
-app = FastAPI()
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router)
 app.include_router(feedback.router)
+app.include_router(diagnostics.router)
+if settings.metrics_enabled:
+    app.include_router(metrics.router)
 
 @app.get("/")
 def root():
@@ -1,3 +1,5 @@
+from typing import List, Optional
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -6,6 +8,21 @@ class Settings(BaseSettings):
     database_password: str
     database_name: str
     database_username: str
+
+    # Database Pool Settings (request engine)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout_seconds: float = 30.0
+    db_pool_recycle_seconds: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 5000
+    db_maintenance_statement_timeout_ms: int = 0  # background jobs (purge, reconcile); 0 = no limit
+
+    # Read Replica Settings
+    database_replica_urls: List[str] = []  # JSON list of postgresql+asyncpg:// URLs; empty reads from the primary
+    db_replica_health_check_interval_seconds: float = 5.0
+    db_replica_max_lag_seconds: float = 10.0
+    read_your_writes_seconds: float = 15.0  # how long a client's reads must see its own last write; >= max lag
     
     # JWT Settings
     secret_key: str
@@ -15,16 +32,106 @@ class Settings(BaseSettings):
     refresh_token_expire_days: int
     verification_token_expire_hours: int
     password_reset_token_expire_hours: int
+    jwt_cache_enabled: bool = True
+    jwt_cache_max_size: int = 10000
     
     # Email Settings
     resend_api_key: str
     mail_from: str
     mail_from_name: str
+    mail_server: str = "smtp.resend.com"
+    mail_port: int = 587
+    mail_username: str = "resend"
+    mail_starttls: bool = True
+    mail_ssl_tls: bool = False
+    mail_use_credentials: bool = True
+    mail_validate_certs: bool = True
+    mail_timeout_seconds: float = 30.0
+    mail_pool_size: int = 4
+    mail_keepalive_seconds: float = 30.0  # pooled connections idle longer are probed with NOOP before reuse
+    mail_max_messages_per_connection: int = 100
+
+    # Email Outbox Settings
+    email_outbox_batch_size: int = 20
+    email_outbox_poll_interval_seconds: float = 5.0
+    email_outbox_max_attempts: int = 8
+    email_outbox_backoff_base_seconds: float = 30.0
+    email_outbox_backoff_max_seconds: float = 3600.0
     
     # URL Settings
     frontend_url: str
     backend_url: str
 
+    # Password Hashing Settings
+    password_hash_workers: Optional[int] = None  # defaults to the number of CPU cores
+    password_hash_max_concurrency: Optional[int] = None  # defaults to the number of workers
+    password_hash_queue_timeout_seconds: float = 5.0
+
+    # Message Counter Settings
+    message_count_reconcile_interval_seconds: float = 3600.0
+    message_count_reconcile_batch_size: int = 1000
+
+    # Auth Cache Settings
+    user_cache_max_size: int = 10000
+    user_cache_ttl_seconds: float = 30.0
+    recipient_cache_max_size: int = 50000
+    recipient_cache_ttl_seconds: float = 60.0
+
+    # Rate Limit Settings
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"  # "memory" (per worker) or "redis" (shared)
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+    rate_limit_max_buckets: int = 100000
+    rate_limit_trust_forwarded_for: bool = False
+    rate_limit_trusted_proxy_hops: int = 1  # proxies in front of the app that append to X-Forwarded-For
+    feedback_rate_limit_per_ip_per_minute: float = 10
+    feedback_rate_limit_per_ip_burst: int = 5
+    feedback_rate_limit_per_recipient_per_minute: float = 120
+    feedback_rate_limit_per_recipient_burst: int = 30
+
+    # Duplicate Feedback Settings
+    duplicate_feedback_window_seconds: float = 3600.0  # 0 disables the check
+    # "collapse" (201, not stored) or "reject" (409). A 409 tells any sender whether that text was already
+    # sent to the recipient within the window, so "reject" is opt-in
+    duplicate_feedback_action: str = "collapse"
+
+    # Feedback Write Batching Settings
+    feedback_batching_enabled: bool = False
+    feedback_batch_max_rows: int = 500
+    feedback_batch_max_delay_ms: int = 20
+
+    # Signup Availability Prefilter Settings
+    availability_filter_capacity: int = 1_000_000
+    availability_filter_error_rate: float = 0.01
+    availability_filter_rebuild_interval_seconds: float = 600.0
+
+    # Inbox Push Settings
+    inbox_events_backend: str = "memory"  # "memory" (per worker) or "postgres" (LISTEN/NOTIFY, shared)
+    inbox_events_queue_size: int = 100
+    inbox_events_reconnect_seconds: float = 5.0
+    sse_heartbeat_seconds: float = 15.0
+
+    # Operations Endpoint Settings
+    ops_token: Optional[str] = None  # Bearer token for /diagnostics and /metrics; unset hides them (404)
+
+    # Metrics Settings
+    metrics_enabled: bool = True
+    event_loop_monitor_interval_ms: int = 100
+    event_loop_block_threshold_ms: int = 100
+
+    # Message Retention Settings
+    message_retention_days: Optional[int] = None  # None keeps messages forever
+    message_retention_interval_seconds: float = 3600.0
+    message_retention_batch_size: int = 5000
+    message_partition_premake_months: int = 3
+
     model_config = SettingsConfigDict(env_file=".env")
 
+    @model_validator(mode="after")
+    def check_read_your_writes_window(self) -> "Settings":
+        # Once the window ends, reads may go to any replica in rotation, and those can be up to max lag behind
+        if self.read_your_writes_seconds < self.db_replica_max_lag_seconds:
+            raise ValueError("read_your_writes_seconds must be at least db_replica_max_lag_seconds")
+        return self
+
 settings = Settings()
\ No newline at end of file
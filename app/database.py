@@ -1,23 +1,287 @@
-from sqlalchemy import create_engine
+import asyncio
+import bisect
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Engine, create_engine, exc, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from .config import settings
 
+# Configure logging
+logger = logging.getLogger(__name__)
+
 SQLALCHEMY_DATABASE_URL = (
     f"postgresql+psycopg2://{settings.database_username}:{settings.database_password}"
     f"@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
 )
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+ASYNC_SQLALCHEMY_DATABASE_URL = (
+    f"postgresql+asyncpg://{settings.database_username}:{settings.database_password}"
+    f"@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
+)
+
+
+class PoolStats:
+    """Checkout counters and a wait-time histogram for the request pool."""
+
+    # Upper bounds in seconds; the last bucket catches everything slower
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float("inf"))
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.bucket_counts: List[int] = [0] * len(self.BUCKETS)
+
+    def observe(self, seconds: float):
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        self.bucket_counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+
+pool_stats = PoolStats()
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout takes (queueing, connecting, pre-ping)."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        finally:
+            pool_stats.observe(time.perf_counter() - started)
+
+
+# Seconds the replica is behind the primary (0 when it has replayed everything it received;
+# an idle primary would otherwise make a caught-up replica look ever more stale), and how far it has replayed
+REPLICA_STATUS_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END, "
+    "pg_last_wal_replay_lsn()::text"
+)
+
+# Where the primary's WAL ends; read after a commit, it is at or past that commit
+CURRENT_LSN_SQL = text("SELECT pg_current_wal_lsn()::text")
+
+def parse_lsn(lsn: Optional[str]) -> Optional[int]:
+    """'16/B374D848' -> a comparable integer; None for a missing or malformed value."""
+    if not lsn:
+        return None
+    high, _, low = lsn.partition("/")
+    try:
+        return (int(high, 16) << 32) | int(low, 16)
+    except ValueError:
+        return None
+
+
+class ReplicaSet:
+    """
+    Read replicas, picked round-robin for read-only sessions. check() runs
+    periodically and takes a replica out of rotation while it is unreachable or
+    lags too far behind the primary; with none usable, reads go to the primary.
+    It also records how far each replica has replayed, so a read that must see
+    a given commit only goes to replicas known to have it.
+    """
+
+    def __init__(self):
+        self.engines: List[AsyncEngine] = []
+        self.healthy: List[Optional[bool]] = []  # None until the first health check
+        self.lag_seconds: List[Optional[float]] = []
+        self.replay_lsn: List[Optional[int]] = []
+        self._next = 0
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    def configure(self, urls: List[str]):
+        self.engines = [
+            create_async_engine(
+                url,
+                pool_size=settings.db_pool_size,
+                max_overflow=settings.db_max_overflow,
+                pool_timeout=settings.db_pool_timeout_seconds,
+                pool_recycle=settings.db_pool_recycle_seconds,
+                pool_pre_ping=settings.db_pool_pre_ping,
+                # Read-only at the server too, so a write routed here by mistake fails loudly
+                connect_args={"server_settings": {
+                    "statement_timeout": str(settings.db_statement_timeout_ms),
+                    "default_transaction_read_only": "on",
+                }}
+            )
+            for url in urls
+        ]
+        # Out of rotation until the first health check has seen them
+        self.healthy = [None] * len(self.engines)
+        self.lag_seconds = [None] * len(self.engines)
+        self.replay_lsn = [None] * len(self.engines)
+        self._next = 0
+
+    def pick(self, min_lsn: Optional[int] = None) -> Optional[AsyncEngine]:
+        """
+        The next healthy replica in turn that, as of its last check, had replayed
+        up to `min_lsn` (if given), or None. The recorded position only trails the
+        real one, so a replica that qualifies has the commit.
+        """
+        for _ in range(len(self.engines)):
+            index = self._next
+            self._next = (self._next + 1) % len(self.engines)
+            if not self.healthy[index]:
+                continue
+            if min_lsn is not None and (self.replay_lsn[index] is None or self.replay_lsn[index] < min_lsn):
+                continue
+            return self.engines[index]
+        return None
+
+    @staticmethod
+    async def _measure(engine: AsyncEngine) -> Tuple[float, Optional[int]]:
+        async with engine.connect() as conn:
+            lag, replay_lsn = (await conn.execute(REPLICA_STATUS_SQL)).one()
+            return float(lag or 0), parse_lsn(replay_lsn)
+
+    async def _check_one(self, index: int, max_lag: float, timeout: float):
+        engine = self.engines[index]
+        name = engine.url.render_as_string(hide_password=True)
+        try:
+            lag, replay_lsn = await asyncio.wait_for(self._measure(engine), timeout)
+        except Exception as e:
+            lag, replay_lsn = None, None
+            healthy, reason = False, f"failed its health check: {str(e) or type(e).__name__}"
+        else:
+            healthy, reason = lag <= max_lag, f"is {lag:.1f}s behind the primary"
+
+        if healthy != self.healthy[index]:
+            if healthy:
+                logger.info(f"Replica {name} is in rotation")
+            else:
+                logger.warning(f"Replica {name} {reason}; taking it out of rotation")
+        self.healthy[index] = healthy
+        self.lag_seconds[index] = lag
+        self.replay_lsn[index] = replay_lsn
+
+    async def check(self, max_lag: float, timeout: float):
+        await asyncio.gather(*[self._check_one(index, max_lag, timeout) for index in range(len(self.engines))])
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "url": engine.url.render_as_string(hide_password=True),
+                "healthy": healthy,
+                "lag_seconds": None if lag is None else round(lag, 3),
+            }
+            for engine, healthy, lag in zip(self.engines, self.healthy, self.lag_seconds)
+        ]
+
+    async def dispose(self):
+        for engine in self.engines:
+            await engine.dispose()
+        self.engines, self.healthy, self.lag_seconds, self.replay_lsn = [], [], [], []
+
+replicas = ReplicaSet()
+
+
+# Engines are created on demand (init_async_engine / get_engine) rather than at import,
+# so importing the app stays cheap and never touches the database
+engine: Optional[Engine] = None
+async_engine: Optional[AsyncEngine] = None
+
+# Sync sessions, used by schema management and maintenance scripts; bound by get_engine()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+# Async sessions, used by the request handlers; bound by init_async_engine()
+# expire_on_commit=False so attributes stay readable after commit without an implicit (sync) refresh
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+def get_engine() -> Engine:
+    """Return the sync engine, creating it on first use."""
+    global engine
+    if engine is None:
+        engine = create_engine(SQLALCHEMY_DATABASE_URL)
+        SessionLocal.configure(bind=engine)
+    return engine
+
+def init_async_engine() -> AsyncEngine:
+    """Create the async request engine and bind AsyncSessionLocal to it. Idempotent."""
+    global async_engine
+    if async_engine is None:
+        async_engine = create_async_engine(
+            ASYNC_SQLALCHEMY_DATABASE_URL,
+            poolclass=InstrumentedAsyncPool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_seconds,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            pool_pre_ping=settings.db_pool_pre_ping,
+            # Server-side limit so one runaway query can't hold a pooled connection indefinitely
+            connect_args={"server_settings": {"statement_timeout": str(settings.db_statement_timeout_ms)}}
+        )
+        AsyncSessionLocal.configure(bind=async_engine)
+        replicas.configure(settings.database_replica_urls)
+    return async_engine
+
+async def dispose_engines():
+    global engine, async_engine
+    if async_engine is not None:
+        await async_engine.dispose()
+        async_engine = None
+    await replicas.dispose()
+    if engine is not None:
+        engine.dispose()
+        engine = None
 
 class Base(DeclarativeBase):
     pass
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def set_maintenance_timeout(db: AsyncSession):
+    """
+    Replace the request engine's statement_timeout for the rest of this transaction
+    with the maintenance budget; background jobs scan far more rows than requests.
+    """
+    await db.execute(text(f"SET LOCAL statement_timeout = {int(settings.db_maintenance_statement_timeout_ms)}"))
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+def read_session(min_lsn: Optional[int] = None) -> AsyncSession:
+    """
+    A session for read-only work: on a healthy replica that has replayed up to
+    `min_lsn` (if given), or on the primary if none qualifies.
+    """
+    replica = replicas.pick(min_lsn)
+    if replica is None:
+        return AsyncSessionLocal()
+    return AsyncSessionLocal(bind=replica)
+
+async def switch_to_primary(db: AsyncSession):
+    """
+    Point a read_session() at the primary for the rest of its use, e.g. when its
+    replica turns out not to have a row yet. Ends the session's current transaction.
+    """
+    await db.close()
+    db.sync_session.bind = init_async_engine().sync_engine
+
+def get_pool_status() -> Dict[str, Any]:
+    """Current occupancy of the request pool plus the checkout wait histogram."""
+    pool = init_async_engine().pool
+    cumulative = 0
+    histogram = {}
+    for bound, count in zip(PoolStats.BUCKETS, pool_stats.bucket_counts):
+        cumulative += count
+        histogram["+Inf" if bound == float("inf") else str(bound)] = cumulative
+
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # overflow() counts down from -pool_size while the pool is still filling up
+        "overflow": max(0, pool.overflow()),
+        "max_overflow": settings.db_max_overflow,
+        "checkouts": pool_stats.checkouts,
+        "timeouts": pool_stats.timeouts,
+        "wait_seconds_total": round(pool_stats.wait_seconds_total, 6),
+        "wait_seconds_histogram": histogram,
+    }
\ No newline at end of file
@@ -0,0 +1,141 @@
+"""
+Explicit schema management step. Run it once per deploy, before starting the app:
+
+    python -m app.migrate
+
+Creates missing tables, then applies idempotent upgrades for columns and
+indexes added to tables that may already exist.
+
+    python -m app.migrate --partition-messages
+
+additionally converts messages into monthly range partitions on created_at
+(once; later runs only add partitions for the coming months). The conversion
+copies every message while holding an exclusive lock, so run it in a
+maintenance window.
+"""
+import argparse
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import Connection, inspect, text
+
+from app.database import Base, get_engine
+# Importing the models also registers their tables on Base.metadata
+from app.models.model import MESSAGE_SEARCH_CONFIG
+from app.config import settings
+from app.utils.retention import (
+    IS_PARTITIONED_SQL, add_months, create_partition_sql, month_start, upcoming_months
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Indexes added after their table was first created; create_all only builds them on new tables
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_messages_recipient_id_created_at_id ON messages (recipient_id, created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_users_username_lower ON users (lower(username))",
+    "CREATE INDEX IF NOT EXISTS ix_users_email_lower ON users (lower(email))",
+    "CREATE INDEX IF NOT EXISTS ix_messages_search_vector ON messages USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_messages_created_at ON messages (created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_messages_recipient_id_content_hash ON messages (recipient_id, content_hash, created_at)",
+]
+
+def _ensure_column(conn: Connection, table: str, column: str, ddl: str, backfill: Optional[str] = None):
+    """Add `column` to `table` if it is missing, then run the optional backfill statement."""
+    existing = {col["name"] for col in inspect(conn).get_columns(table)}
+    if column in existing:
+        return
+
+    logger.info(f"Adding column {table}.{column}")
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    if backfill:
+        conn.execute(text(backfill))
+
+def partition_messages(conn: Connection, months_ahead: int):
+    """
+    Rebuild messages as a table partitioned by month on created_at, keeping every
+    column (LIKE copies defaults and generated columns). The primary key becomes
+    (id, created_at), since a partitioned table's unique constraints must include
+    the partition key. Indexes are recreated afterwards by upgrade().
+    """
+    if conn.execute(IS_PARTITIONED_SQL).scalar():
+        return
+
+    logger.info("Converting messages to monthly partitions")
+    columns = ", ".join(col["name"] for col in inspect(conn).get_columns("messages") if not col.get("computed"))
+
+    # The partition key can't be NULL
+    conn.execute(text("UPDATE messages SET created_at = timezone('utc', now()) WHERE created_at IS NULL"))
+    conn.execute(text(
+        "CREATE TABLE messages_partitioned (LIKE messages INCLUDING DEFAULTS INCLUDING GENERATED) "
+        "PARTITION BY RANGE (created_at)"
+    ))
+    conn.execute(text(
+        "ALTER TABLE messages_partitioned "
+        "ALTER COLUMN created_at SET NOT NULL, "
+        "ADD CONSTRAINT messages_partitioned_pkey PRIMARY KEY (id, created_at), "
+        "ADD CONSTRAINT messages_partitioned_recipient_id_fkey "
+        "FOREIGN KEY (recipient_id) REFERENCES users (id) ON DELETE CASCADE"
+    ))
+
+    # One partition per month from the oldest message through the premade months
+    months = upcoming_months(months_ahead)
+    oldest, newest = conn.execute(text("SELECT min(created_at), max(created_at) FROM messages")).one()
+    month = month_start(oldest) if oldest else months[0]
+    last = max(months[-1], month_start(newest)) if newest else months[-1]
+    while month <= last:
+        conn.execute(text(create_partition_sql(month, parent="messages_partitioned")))
+        month = add_months(month, 1)
+
+    conn.execute(text(f"INSERT INTO messages_partitioned ({columns}) SELECT {columns} FROM messages"))
+    conn.execute(text("DROP TABLE messages"))
+    conn.execute(text("ALTER TABLE messages_partitioned RENAME TO messages"))
+    conn.execute(text("ALTER TABLE messages RENAME CONSTRAINT messages_partitioned_pkey TO messages_pkey"))
+    conn.execute(text(
+        "ALTER TABLE messages RENAME CONSTRAINT messages_partitioned_recipient_id_fkey TO messages_recipient_id_fkey"
+    ))
+
+def upgrade(conn: Connection, partition: bool = False):
+    _ensure_column(
+        conn, "users", "message_count", "integer NOT NULL DEFAULT 0",
+        backfill="UPDATE users SET message_count = (SELECT count(*) FROM messages WHERE messages.recipient_id = users.id)"
+    )
+
+    # Generated column: adding it rewrites the messages table once
+    _ensure_column(
+        conn, "messages", "search_vector",
+        f"tsvector GENERATED ALWAYS AS (to_tsvector('{MESSAGE_SEARCH_CONFIG}', content)) STORED"
+    )
+
+    _ensure_column(conn, "users", "inbox_version", "bigint NOT NULL DEFAULT 0")
+    _ensure_column(conn, "users", "inbox_updated_at", "timestamp NOT NULL DEFAULT timezone('utc', now())")
+    # Left NULL on existing rows: only messages inside the (short) duplicate window are ever compared
+    _ensure_column(conn, "messages", "content_hash", "bigint")
+
+    if partition:
+        partition_messages(conn, settings.message_partition_premake_months)
+    if conn.execute(IS_PARTITIONED_SQL).scalar():
+        for month in upcoming_months(settings.message_partition_premake_months):
+            conn.execute(text(create_partition_sql(month)))
+
+    for statement in INDEXES:
+        conn.execute(text(statement))
+
+def migrate(partition: bool = False):
+    started = time.perf_counter()
+    engine = get_engine()
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        upgrade(conn, partition=partition)
+
+    logger.info(f"Schema is up to date ({time.perf_counter() - started:.2f}s)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create or upgrade the database schema.")
+    parser.add_argument("--partition-messages", action="store_true", help="convert messages to monthly partitions")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    migrate(partition=args.partition_messages)
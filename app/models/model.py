@@ -1,10 +1,18 @@
 import uuid
 from datetime import datetime, timezone
-from typing import List, Optional
-from sqlalchemy import String, Boolean, ForeignKey, DateTime, Text, UUID
+from typing import Any, Dict, List, Optional
+from sqlalchemy import String, Boolean, ForeignKey, DateTime, Text, UUID, Integer, BigInteger, JSON, Index, Computed, text, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
+# Text search configuration used for messages.search_vector and for parsing search queries
+MESSAGE_SEARCH_CONFIG = "english"
+
+def utcnow_naive() -> datetime:
+    # created_at columns are "timestamp without time zone"; asyncpg rejects tz-aware values for them
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 class User(Base):
     __tablename__ = "users"
 
@@ -15,12 +23,22 @@ class User(Base):
     is_verified: Mapped[bool] = mapped_column(Boolean, default=False)
     verification_token: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     is_accepting_messages: Mapped[bool] = mapped_column(Boolean, default=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    # Denormalized count of received messages, maintained alongside message inserts/deletes
+    message_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped with every inbox change; validators for conditional GETs on the inbox endpoints
+    inbox_version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
+    inbox_updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=utcnow_naive, server_default=text("timezone('utc', now())"))
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow_naive, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
 
     # Relationship
     messages: Mapped[List["Message"]] = relationship("Message", back_populates="recipient", cascade="all, delete-orphan")
 
+# Serve the lower(...) = ? availability and signup checks. Not unique: databases from before
+# case-insensitive checks can hold both "Alice" and "alice"
+Index("ix_users_username_lower", func.lower(User.username))
+Index("ix_users_email_lower", func.lower(User.email))
+
 
 class Message(Base):
     __tablename__ = "messages"
@@ -28,7 +46,45 @@ class Message(Base):
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     recipient_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow_naive)
+    # Fingerprint of the normalized content (app.utils.duplicates); NULL for messages stored before it existed
+    content_hash: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    # Maintained by Postgres from content; deferred so it is never loaded with the message
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{MESSAGE_SEARCH_CONFIG}', content)", persisted=True),
+        deferred=True
+    )
 
     # Relationship
-    recipient: Mapped["User"] = relationship("User", back_populates="messages")
\ No newline at end of file
+    recipient: Mapped["User"] = relationship("User", back_populates="messages")
+
+# Serves the inbox keyset pagination: WHERE recipient_id = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC
+Index("ix_messages_recipient_id_created_at_id", Message.recipient_id, Message.created_at.desc(), Message.id.desc())
+# Retention purge: oldest-first batches of expired messages
+Index("ix_messages_created_at", Message.created_at)
+# Duplicate check: WHERE recipient_id = ? AND content_hash = ? AND created_at >= ?
+Index("ix_messages_recipient_id_content_hash", Message.recipient_id, Message.content_hash, Message.created_at)
+# Full-text search; combined with the recipient_id index via a bitmap AND
+Index("ix_messages_search_vector", Message.search_vector, postgresql_using="gin")
+
+class EmailOutbox(Base):
+    """
+    Emails waiting to be sent. Rows are written in the same transaction as the
+    user change that triggers them and drained by the outbox dispatcher.
+    """
+    __tablename__ = "email_outbox"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind: Mapped[str] = mapped_column(String(50), nullable=False)
+    recipient: Mapped[str] = mapped_column(String(255), nullable=False)
+    payload: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow_naive, nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow_naive, nullable=False)
+
+    __table_args__ = (
+        Index("ix_email_outbox_pending", "next_attempt_at", postgresql_where=text("status = 'pending'")),
+    )
\ No newline at end of file
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Query, Request
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
-from passlib.context import CryptContext
 import logging
 
 from app.database import get_db
+from app.utils.read_routing import get_read_db, remember_write
 from app.models.model import User
 
 from app.schemas.user_schema import UserCreate, UserLogin, UserResponse, LoginResponse, ResendVerification
@@ -15,22 +17,33 @@ from app.utils.tokens import (
     create_refresh_token,
     verify_refresh_token
 )
-from app.utils.email_service import email_service
+from app.utils.email_outbox import enqueue_email, email_dispatcher, VERIFICATION_EMAIL, WELCOME_EMAIL
+from app.utils.password import password_hasher
+from app.utils.auth import user_cache
+from app.utils.availability import announce_registration, availability_filter
+from app.utils.recipients import recipient_cache
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 router = APIRouter(
     prefix="/auth",
     tags=["Authentication"]
 )
 
 @router.get("/check-username", response_model=dict)
-async def check_username_availability(username: str = Query(..., min_length=3, max_length=20), db: Session = Depends(get_db)):
-    # Check if username exists (case-insensitive)
-    existing_user = db.query(User).filter(User.username.ilike(username)).first()
+async def check_username_availability(username: str = Query(..., min_length=3, max_length=20), db: AsyncSession = Depends(get_read_db)):
+    # Bloom filter miss: the username was never registered, no need to query
+    if not availability_filter.might_have_username(username):
+        return {
+            "available": True,
+            "message": "Username is available"
+        }
+    
+    # Check if username exists (case-insensitive, served by ix_users_username_lower)
+    existing_user = (await db.execute(
+        select(User.id).where(func.lower(User.username) == username.lower()).limit(1)
+    )).first()
     
     if existing_user:
         return {
@@ -44,9 +57,18 @@ async def check_username_availability(username: str = Query(..., min_length=3, m
     }
 
 @router.get("/check-email", response_model=dict)
-async def check_email_availability(email: str = Query(..., description="Email to check"), db: Session = Depends(get_db)):
-    # Check if email exists (case-insensitive)
-    existing_user = db.query(User).filter(User.email.ilike(email)).first()
+async def check_email_availability(email: str = Query(..., description="Email to check"), db: AsyncSession = Depends(get_read_db)):
+    # Bloom filter miss: the email was never registered, no need to query
+    if not availability_filter.might_have_email(email):
+        return {
+            "available": True,
+            "message": "Email is available"
+        }
+    
+    # Check if email exists (case-insensitive, served by ix_users_email_lower)
+    existing_user = (await db.execute(
+        select(User.id).where(func.lower(User.email) == email.lower()).limit(1)
+    )).first()
     
     if existing_user:
         return {
@@ -60,9 +82,13 @@ async def check_email_availability(email: str = Query(..., description="Email to
     }
 
 @router.post("/register", status_code=status.HTTP_201_CREATED, response_model=dict)
-async def signup(user: UserCreate, db: Session = Depends(get_db)):
+async def signup(user: UserCreate, response: Response, db: AsyncSession = Depends(get_db)):
     # Check if username or email already exixts
-    existing_user = db.query(User).filter((User.username == user.username) | (User.email == user.email)).first()
+    existing_user = (await db.execute(
+        select(User.id).where(
+            (func.lower(User.username) == user.username.lower()) | (func.lower(User.email) == user.email.lower())
+        ).limit(1)
+    )).first()
     if existing_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username or email already exists")
     
@@ -72,26 +98,33 @@ async def signup(user: UserCreate, db: Session = Depends(get_db)):
     new_user = User(
         username=user.username,
         email=user.email,
-        password = pwd_context.hash(user.password),
+        password = await password_hasher.hash(user.password),
         verification_token = verification_token,
         is_verified=False,
         is_accepting_messages=True,
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
 
-    # Send the VErfification Mail
+    # Queue the verification mail in the same transaction; the outbox dispatcher sends it
+    enqueue_email(
+        db,
+        VERIFICATION_EMAIL,
+        recipient=new_user.email,
+        username=new_user.username,
+        verification_token=verification_token
+    )
+    await announce_registration(db, new_user.username, new_user.email)
     try:
-        await email_service.send_verification_email(
-            email=new_user.email,
-            username=new_user.username,
-            verification_token=verification_token
-        )
-    except Exception as e:
-        # Log error but don't fail registration
-        logger.error(f"Error sending verification email to {new_user.email}: {str(e)}", exc_info=True)
+        await db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent registration of the same username/email
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username or email already exists")
+    await db.refresh(new_user)
+    await remember_write(db, response)
+    email_dispatcher.wake()
+    availability_filter.add_user(new_user.username, new_user.email)
     
     return {
         "message": "User registered successfully. Please check your email to verify your account.",
@@ -100,12 +133,12 @@ async def signup(user: UserCreate, db: Session = Depends(get_db)):
     }
 
 @router.get("/verify-email", status_code=status.HTTP_200_OK, response_model=dict)
-async def verify_email(token: str, db: Session = Depends(get_db)):
+async def verify_email(token: str, response: Response, db: AsyncSession = Depends(get_db)):
     email = verify_verification_token(token)
     if not email:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired verification token")
     
-    user = db.query(User).filter(User.email == email).first()
+    user = (await db.execute(select(User).where(User.email == email))).scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     if user.is_verified:
@@ -118,23 +151,21 @@ async def verify_email(token: str, db: Session = Depends(get_db)):
     # Update user
     user.is_verified = True
     user.verification_token = None
-    db.commit()
 
-    # Send welcome email
-    try:
-        await email_service.send_welcome_email(
-            email=user.email,
-            username=user.username
-        )
-    except Exception as e:
-        logger.error(f"Error sending welcome email to {user.email}: {str(e)}", exc_info=True)
+    # Queue welcome email
+    enqueue_email(db, WELCOME_EMAIL, recipient=user.email, username=user.username)
+    await db.commit()
+    user_cache.invalidate(str(user.id))
+    recipient_cache.invalidate(user.username)
+    await remember_write(db, response)
+    email_dispatcher.wake()
     
     return {"message": "Email verified successfully"}
 
 @router.post("/resend-verification", status_code=status.HTTP_200_OK, response_model=dict)
-async def resend_verification_email(request_data: ResendVerification, db: Session = Depends(get_db)):
+async def resend_verification_email(request_data: ResendVerification, db: AsyncSession = Depends(get_db)):
     # Find user by email
-    user = db.query(User).filter(User.email == request_data.email).first()
+    user = (await db.execute(select(User).where(User.email == request_data.email))).scalar_one_or_none()
     
     if not user:
         # Security: Don't reveal if email exists or not
@@ -155,22 +186,18 @@ async def resend_verification_email(request_data: ResendVerification, db: Sessio
     
     # Update user's verification token
     user.verification_token = new_verification_token
-    db.commit()
     
-    # Send verification email
-    try:
-        await email_service.send_verification_email(
-            email=user.email,
-            username=user.username,
-            verification_token=new_verification_token
-        )
-        logger.info(f"Verification email resent to {user.email}")
-    except Exception as e:
-        logger.error(f"Error resending verification email to {user.email}: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to send verification email. Please try again later."
-        )
+    # Queue verification email
+    enqueue_email(
+        db,
+        VERIFICATION_EMAIL,
+        recipient=user.email,
+        username=user.username,
+        verification_token=new_verification_token
+    )
+    await db.commit()
+    email_dispatcher.wake()
+    logger.info(f"Verification email queued for {user.email}")
     
     return {
         "message": "Verification email has been sent. Please check your inbox.",
@@ -178,11 +205,13 @@ async def resend_verification_email(request_data: ResendVerification, db: Sessio
     }
 
 @router.post("/login", response_model=LoginResponse)
-async def login(user_credentials: UserLogin, response: Response, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, response: Response, db: AsyncSession = Depends(get_db)):
     # Find user by email or username
-    user = db.query(User).filter(
-        (User.email == user_credentials.identifier) | (User.username == user_credentials.identifier)
-    ).first()
+    user = (await db.execute(
+        select(User).where(
+            (User.email == user_credentials.identifier) | (User.username == user_credentials.identifier)
+        )
+    )).scalars().first()
     
     if not user:
         raise HTTPException(
@@ -192,7 +221,7 @@ async def login(user_credentials: UserLogin, response: Response, db: Session = D
         )
     
     # Verify password
-    if not pwd_context.verify(user_credentials.password, user.password):
+    if not await password_hasher.verify(user_credentials.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
@@ -218,6 +247,8 @@ async def login(user_credentials: UserLogin, response: Response, db: Session = D
         samesite="lax",
         max_age=7 * 24 * 60 * 60  # 7 days
     )
+    # The account may be newer than what the replicas have replayed; keep this client's reads behind it
+    await remember_write(db, response)
     
     return LoginResponse(
         access_token=access_token,
@@ -227,7 +258,7 @@ async def login(user_credentials: UserLogin, response: Response, db: Session = D
     )
 
 @router.post("/refresh", response_model=dict)
-async def refresh_token(request: Request, response: Response, db: Session = Depends(get_db)):
+async def refresh_token(request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     # Get refresh token from cookie
     refresh_token = request.cookies.get("refresh_token")
     
@@ -260,7 +291,7 @@ async def refresh_token(request: Request, response: Response, db: Session = Depe
         )
     
     # Verify user still exists and is verified
-    user = db.query(User).filter(User.id == user_id).first()
+    user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
     
     if not user:
         raise HTTPException(
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, Request
+
+from app.database import get_pool_status, replicas
+from app.utils.auth import require_ops_token, user_cache
+from app.utils.email_service import email_service
+from app.utils.inbox_events import inbox_broker
+from app.utils.password import password_hasher
+from app.utils.recipients import recipient_cache
+from app.utils.tokens import access_token_cache, refresh_token_cache
+
+router = APIRouter(
+    prefix="/diagnostics",
+    tags=["Diagnostics"],
+    dependencies=[Depends(require_ops_token)]
+)
+
+@router.get("/pool", response_model=dict)
+async def pool_diagnostics():
+    """
+    Connection pool occupancy (checked-out, overflow) and the checkout wait-time histogram.
+    Histogram buckets are cumulative, keyed by upper bound in seconds.
+    """
+    return get_pool_status()
+
+@router.get("/replicas", response_model=dict)
+async def replica_diagnostics():
+    """Configured read replicas with their health and replication lag from the last check."""
+    return {"replicas": replicas.status()}
+
+@router.get("/password-hasher", response_model=dict)
+async def password_hasher_diagnostics():
+    """Queue depth, in-flight count and latency of the password hashing pool."""
+    return password_hasher.stats()
+
+@router.get("/caches", response_model=dict)
+async def cache_diagnostics():
+    """Size and hit/miss counters of the in-process caches."""
+    return {
+        "users": user_cache.stats(),
+        "recipients": recipient_cache.stats(),
+        "access_tokens": access_token_cache.stats(),
+        "refresh_tokens": refresh_token_cache.stats(),
+    }
+
+@router.get("/inbox-streams", response_model=dict)
+async def inbox_stream_diagnostics():
+    """Number of inbox event streams open on this worker, and how many users they belong to."""
+    return inbox_broker.stats()
+
+@router.get("/smtp", response_model=dict)
+async def smtp_diagnostics():
+    """SMTP connection pool: idle connections and how many were opened or replaced so far."""
+    return email_service.pool.stats()
+
+@router.get("/startup", response_model=dict)
+async def startup_diagnostics(request: Request):
+    """Time spent importing the app modules and running the lifespan startup, in milliseconds."""
+    return request.app.state.startup_report
@@ -1,13 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import Annotated, List
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import Row, Select, select, delete, update, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated, AsyncIterator, Literal, Optional, Union
+import asyncio
+import csv
+import io
+import json
 import logging
 import uuid
 
-from app.database import get_db
-from app.models.model import User, Message
-from app.schemas.message_schema import MessageCreate, MessageAcceptanceToggle, MessageResponse
-from app.utils.auth import get_current_verified_user
+from app.database import get_db, AsyncSessionLocal, switch_to_primary
+from app.models.model import User, Message, MESSAGE_SEARCH_CONFIG
+from app.schemas.message_schema import (
+    MessageCreate,
+    MessageAcceptanceToggle,
+    MessagePage,
+    MessageSearchPage,
+    MessageBulkDelete
+)
+from app.utils.auth import get_current_verified_user, user_cache
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.responses import FastJSONResponse, dumps
+from app.utils.conditional import bump_inbox_version, inbox_validators, is_not_modified, not_modified
+from app.utils.duplicates import DUPLICATE_COLLAPSE, DuplicateMessage
+from app.utils.message_counts import adjust_message_count
+from app.utils.recipients import Recipient, recipient_cache, resolve_recipient, insert_message
+from app.utils.rate_limit import limit_feedback_submission
+from app.utils.feedback_batcher import feedback_batcher
+from app.utils.inbox_events import inbox_broker, emit, message_created, message_deleted, messages_deleted
+from app.utils.read_routing import get_read_db, remember_write
+from app.config import settings
 from app.schemas.user_schema import UserResponse
 
 # Configure logging
@@ -15,40 +38,99 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Feedback"])
 
-@router.post("/u/{username}", status_code=status.HTTP_201_CREATED, response_model=dict)
-async def submit_feedback(username: str, message_data: MessageCreate, db: Session = Depends(get_db)):
-    # Find recipient
-    user = db.query(User).filter(User.username == username).first()
-    
-    if not user:
+# Rows fetched per round trip from the server-side cursor during exports
+EXPORT_BATCH_SIZE = 1000
+
+# How long an EventSource client waits before reconnecting a dropped inbox stream
+SSE_RETRY_MS = 5000
+
+def ensure_can_receive(recipient: Optional[Recipient]) -> Recipient:
+    if not recipient:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    if not user.is_verified:
+    if not recipient.is_verified:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
     # Check if user accepts messages
-    if not user.is_accepting_messages:
+    if not recipient.is_accepting_messages:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="This user is not accepting feedback at the moment"
         )
     
-    # Create message
-    new_message = Message(
-        recipient_id=user.id,
-        content=message_data.content
-    )
+    return recipient
+
+async def read_own_row(db: AsyncSession, query: Select) -> Row:
+    """
+    The current user's row, from a read session. A replica may not have it yet (a
+    user who signed up moments ago and whose client dropped the read-after cookie);
+    the session then switches to the primary, for this and the request's later reads.
+    """
+    row = (await db.execute(query)).one_or_none()
+    if row is None:
+        await switch_to_primary(db)
+        row = (await db.execute(query)).one_or_none()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return row
+
+async def store_message(db: AsyncSession, recipient_id: uuid.UUID, content: str) -> bool:
+    """
+    Durably store a message, either directly or through the write-behind batcher,
+    and push it to the recipient's open inbox streams.
+    Returns False if the recipient no longer accepts messages; raises
+    DuplicateMessage if the recipient got the same message within the duplicate window.
+    """
+    if settings.feedback_batching_enabled:
+        return await feedback_batcher.submit(recipient_id, content)
     
-    db.add(new_message)
-    db.commit()
+    message = await insert_message(db, recipient_id, content)
+    if message is None:
+        return False
+    await emit(db, message_created(message))
+    await db.commit()
+    return True
+
+@router.post(
+    "/u/{username}",
+    status_code=status.HTTP_201_CREATED,
+    response_model=dict,
+    dependencies=[Depends(limit_feedback_submission)]
+)
+async def submit_feedback(username: str, message_data: MessageCreate, db: AsyncSession = Depends(get_db)):
+    # Find recipient (cached)
+    recipient = ensure_can_receive(await resolve_recipient(db, username))
     
-    logger.info(f"Feedback submitted to user {user.username}")
+    try:
+        # Validate recipient, check for duplicates and create message in one statement
+        if not await store_message(db, recipient.id, message_data.content):
+            # Cached recipient state was stale: re-read it, then retry once
+            recipient_cache.invalidate(username)
+            recipient = ensure_can_receive(await resolve_recipient(db, username))
+            if not await store_message(db, recipient.id, message_data.content):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="User not found"
+                )
+    except DuplicateMessage:
+        if settings.duplicate_feedback_action != DUPLICATE_COLLAPSE:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="This message was already sent to this user recently"
+            )
+        # Collapsed: answered as if stored, so floods get nothing to react to
+        logger.info(f"Duplicate feedback to user {username} collapsed")
+    else:
+        logger.info(f"Feedback submitted to user {username}")
     
     return {
         "message": "Feedback submitted successfully",
@@ -57,66 +139,271 @@ async def submit_feedback(username: str, message_data: MessageCreate, db: Sessio
 
 @router.get("/messages/count", response_model=dict)
 async def get_messages_count(
+    request: Request,
+    response: Response,
     current_user: Annotated[User, Depends(get_current_verified_user)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get the total count of messages received by the authenticated user.
-    Useful for dashboard statistics.
+    Useful for dashboard statistics. Supports If-None-Match / If-Modified-Since.
     """
-    count = db.query(Message).filter(
-        Message.recipient_id == current_user.id
-    ).count()
+    count, version, updated_at = await read_own_row(
+        db, select(User.message_count, User.inbox_version, User.inbox_updated_at).where(User.id == current_user.id)
+    )
+    
+    validators = inbox_validators(current_user.id, version, updated_at)
+    if is_not_modified(request, validators, updated_at):
+        return not_modified(validators)
+    response.headers.update(validators)
     
     logger.info(f"User {current_user.username} has {count} total messages")
     
     return {"count": count}
 
-@router.get("/messages", response_model=List[MessageResponse])
+@router.get("/messages", response_model=MessagePage)
 async def get_my_messages(
+    request: Request,
     current_user: Annotated[User, Depends(get_current_verified_user)],
-    db: Session = Depends(get_db)
+    limit: int = Query(50, ge=1, le=100, description="Maximum number of messages to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    Get all messages received by the authenticated user.
-    Messages are sorted by created_at in descending order (newest first).
+    Get a page of messages received by the authenticated user.
+    Messages are sorted by created_at in descending order (newest first) and
+    paginated by keyset on (created_at, id), so every page is an index range scan.
+    Supports If-None-Match / If-Modified-Since: an unchanged inbox gets a 304
+    without running the message query. Rows are fetched as column tuples and
+    serialized directly, without building ORM objects or validating each item.
     """
-    messages = db.query(Message).filter(
-        Message.recipient_id == current_user.id
-    ).order_by(Message.created_at.desc()).all()
+    # Read before the messages: a concurrent write can only make the validators stale, never ahead
+    version, updated_at = await read_own_row(
+        db, select(User.inbox_version, User.inbox_updated_at).where(User.id == current_user.id)
+    )
     
-    logger.info(f"User {current_user.username} retrieved {len(messages)} messages")
+    validators = inbox_validators(current_user.id, version, updated_at)
+    if is_not_modified(request, validators, updated_at):
+        return not_modified(validators)
     
-    return messages
+    query = select(Message.id, Message.content, Message.created_at).where(Message.recipient_id == current_user.id)
+    
+    if cursor:
+        created_at, message_id = decode_cursor(cursor)
+        query = query.where(tuple_(Message.created_at, Message.id) < tuple_(created_at, message_id))
+    
+    # Fetch one extra row to know whether there is a next page
+    rows = (await db.execute(
+        query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1)
+    )).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    
+    logger.info(f"User {current_user.username} retrieved {len(rows)} messages")
+    
+    # Same shape as MessagePage
+    return FastJSONResponse(
+        {
+            "items": [
+                {"id": message_id, "content": content, "created_at": created_at}
+                for message_id, content, created_at in rows
+            ],
+            "next_cursor": next_cursor
+        },
+        headers=validators
+    )
+
+@router.get("/messages/search", response_model=MessageSearchPage)
+async def search_messages(
+    current_user: Annotated[User, Depends(get_current_verified_user)],
+    q: str = Query(..., min_length=1, max_length=200, description="Search terms (web search syntax: quotes, OR, -exclude)"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results to return"),
+    offset: int = Query(0, ge=0, le=1000, description="next_offset from the previous page"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Full-text search over the messages received by the authenticated user.
+    Matches via the GIN-indexed search_vector column and orders by relevance, newest first on ties.
+    """
+    query = func.websearch_to_tsquery(MESSAGE_SEARCH_CONFIG, q)
+    rank = func.ts_rank_cd(Message.search_vector, query)
+    
+    # Fetch one extra row to know whether there is a next page
+    rows = (await db.execute(
+        select(Message.id, Message.content, Message.created_at, rank.label("rank"))
+        .where(Message.recipient_id == current_user.id, Message.search_vector.op("@@")(query))
+        .order_by(rank.desc(), Message.created_at.desc(), Message.id.desc())
+        .offset(offset)
+        .limit(limit + 1)
+    )).all()
+    
+    next_offset = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_offset = offset + limit
+    
+    logger.info(f"User {current_user.username} searched messages, {len(rows)} results")
+    
+    # Same shape as MessageSearchPage
+    return FastJSONResponse({
+        "items": [
+            {"id": message_id, "content": content, "created_at": created_at, "rank": rank}
+            for message_id, content, created_at, rank in rows
+        ],
+        "next_offset": next_offset
+    })
+
+async def _stream_messages(recipient_id: uuid.UUID, export_format: str) -> AsyncIterator[Union[str, bytes]]:
+    # Uses its own session: the request-scoped one is closed before the body is streamed
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(
+            select(Message.id, Message.content, Message.created_at)
+            .where(Message.recipient_id == recipient_id)
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(["id", "content", "created_at"])
+            async for rows in result.partitions():
+                for message_id, content, created_at in rows:
+                    writer.writerow([message_id, content, created_at.isoformat()])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            async for rows in result.partitions():
+                yield b"".join(
+                    dumps({"id": message_id, "content": content, "created_at": created_at}) + b"\n"
+                    for message_id, content, created_at in rows
+                )
+
+@router.get("/messages/export")
+async def export_messages(
+    current_user: Annotated[User, Depends(get_current_verified_user)],
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="ndjson or csv")
+):
+    """
+    Download every message received by the authenticated user, newest first.
+    Rows are read through a server-side cursor and streamed in batches, so memory
+    use stays flat regardless of inbox size.
+    """
+    logger.info(f"User {current_user.username} exporting messages as {export_format}")
+    
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _stream_messages(current_user.id, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="messages.{export_format}"'}
+    )
+
+async def _stream_inbox_events(user_id: uuid.UUID) -> AsyncIterator[str]:
+    queue = inbox_broker.subscribe(user_id)
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=settings.sse_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                # Comment line: keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+    finally:
+        inbox_broker.unsubscribe(user_id, queue)
+
+@router.get("/messages/stream")
+async def stream_inbox(
+    current_user: Annotated[User, Depends(get_current_verified_user)],
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Server-Sent Events stream of inbox changes for the authenticated user
+    (message.created, message.deleted, messages.deleted), replacing dashboard polling.
+    A resync event means events were missed and the inbox should be refetched.
+    """
+    user_id = current_user.id
+    # Give the connection back to the pool; the stream can stay open for hours
+    await db.close()
+    
+    return StreamingResponse(
+        _stream_inbox_events(user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.delete("/messages", status_code=status.HTTP_200_OK, response_model=dict)
+async def delete_messages(
+    criteria: MessageBulkDelete,
+    response: Response,
+    current_user: Annotated[User, Depends(get_current_verified_user)],
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Delete many messages at once: by ID list, everything older than a timestamp, or all.
+    Runs as a single DELETE scoped to the user's inbox; IDs that don't exist or
+    belong to someone else are simply not counted.
+    """
+    query = delete(Message).where(Message.recipient_id == current_user.id)
+    
+    if criteria.ids is not None:
+        query = query.where(Message.id.in_(criteria.ids))
+    elif criteria.older_than is not None:
+        query = query.where(Message.created_at < criteria.older_than)
+    
+    result = await db.execute(query.execution_options(synchronize_session=False))
+    deleted = result.rowcount
+    
+    if deleted:
+        await db.execute(adjust_message_count(current_user.id, -deleted))
+        await emit(db, messages_deleted(current_user.id, deleted))
+    await db.commit()
+    await remember_write(db, response)
+    
+    logger.info(f"User {current_user.username} bulk deleted {deleted} messages")
+    
+    return {
+        "message": f"Deleted {deleted} messages",
+        "deleted": deleted,
+        "success": True
+    }
 
 @router.delete("/messages/{message_id}", status_code=status.HTTP_200_OK, response_model=dict)
 async def delete_message(
     message_id: uuid.UUID,
+    response: Response,
     current_user: Annotated[User, Depends(get_current_verified_user)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a specific message by ID.
-    Users can only delete their own messages (messages they received).
+    Users can only delete their own messages (messages they received); anyone
+    else's message is reported as not found.
     """
-    # Find the message
-    message = db.query(Message).filter(Message.id == message_id).first()
+    # One statement, scoped to the owner: no load-then-delete round trip, and a
+    # concurrent delete of the same message can't decrement the counter twice
+    result = await db.execute(
+        delete(Message)
+        .where(Message.id == message_id, Message.recipient_id == current_user.id)
+        .execution_options(synchronize_session=False)
+    )
     
-    if not message:
+    if result.rowcount == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Message not found"
         )
     
-    # Verify the message belongs to the current user
-    if message.recipient_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to delete this message"
-        )
-    
-    db.delete(message)
-    db.commit()
+    await db.execute(adjust_message_count(current_user.id, -result.rowcount))
+    await emit(db, message_deleted(current_user.id, message_id))
+    await db.commit()
+    await remember_write(db, response)
     
     logger.info(f"User {current_user.username} deleted message {message_id}")
     
@@ -128,11 +415,19 @@ async def delete_message(
 @router.patch("/toggle-messages", response_model=UserResponse)
 async def toggle_message_acceptance(
     toggle_data: MessageAcceptanceToggle,
+    response: Response,
     current_user: Annotated[User, Depends(get_current_verified_user)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    current_user.is_accepting_messages = toggle_data.is_accepting_messages
-    db.commit()
-    db.refresh(current_user)
+    await db.execute(
+        update(User)
+        .where(User.id == current_user.id)
+        .values(is_accepting_messages=toggle_data.is_accepting_messages, **bump_inbox_version())
+    )
+    await db.commit()
+    await remember_write(db, response)
+    user_cache.invalidate(str(current_user.id))
+    recipient_cache.invalidate(current_user.username)
+    await db.refresh(current_user)
     
     return current_user
\ No newline at end of file
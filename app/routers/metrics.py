@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.database import PoolStats, get_pool_status, pool_stats, replicas
+from app.utils.auth import require_ops_token, user_cache
+from app.utils.inbox_events import inbox_broker
+from app.utils.metrics import Histogram, PrometheusWriter, write_request_metrics
+from app.utils.password import password_hasher
+from app.utils.recipients import recipient_cache
+from app.utils.tokens import access_token_cache, refresh_token_cache
+
+router = APIRouter(tags=["Metrics"], dependencies=[Depends(require_ops_token)])
+
+def _write_pool_metrics(writer: PrometheusWriter):
+    status = get_pool_status()
+    writer.scalar("db_pool_size", "gauge", "Configured pool size.", status["size"])
+    writer.scalar("db_pool_checked_out", "gauge", "Connections currently checked out.", status["checked_out"])
+    writer.scalar("db_pool_overflow", "gauge", "Overflow connections currently open.", status["overflow"])
+    writer.scalar("db_pool_timeouts_total", "counter", "Checkouts that timed out.", status["timeouts"])
+
+    wait = Histogram(PoolStats.BUCKETS)
+    wait.bucket_counts = list(pool_stats.bucket_counts)
+    wait.count = pool_stats.checkouts
+    wait.sum = pool_stats.wait_seconds_total
+    writer.histogram("db_pool_checkout_seconds", "Time to check a connection out of the pool.", [({}, wait)])
+
+def _write_replica_metrics(writer: PrometheusWriter):
+    status = replicas.status()
+    writer.family("db_replica_healthy", "gauge", "Whether each read replica is in rotation (1) or not (0).")
+    for replica in status:
+        writer.sample("db_replica_healthy", int(bool(replica["healthy"])), replica=replica["url"])
+    writer.family("db_replica_lag_seconds", "gauge", "Replication lag at the last health check.")
+    for replica in status:
+        if replica["lag_seconds"] is not None:
+            writer.sample("db_replica_lag_seconds", replica["lag_seconds"], replica=replica["url"])
+
+def _write_password_hasher_metrics(writer: PrometheusWriter):
+    stats = password_hasher.stats()
+    writer.scalar("password_hasher_queue_depth", "gauge", "Hash jobs waiting for a worker slot.", stats["queue_depth"])
+    writer.scalar("password_hasher_in_flight", "gauge", "Hash jobs running.", stats["in_flight"])
+    writer.scalar("password_hasher_rejected_total", "counter", "Hash jobs rejected after the queue timeout.", stats["rejected"])
+    writer.family("password_hasher_operations_total", "counter", "Completed hash and verify operations.")
+    for operation, latency in stats["latency_ms"].items():
+        writer.sample("password_hasher_operations_total", latency["count"], operation=operation)
+    writer.family("password_hasher_latency_avg_seconds", "gauge", "Average hash and verify latency.")
+    for operation, latency in stats["latency_ms"].items():
+        writer.sample("password_hasher_latency_avg_seconds", latency["avg"] / 1000, operation=operation)
+
+def _write_cache_metrics(writer: PrometheusWriter):
+    caches = {
+        "users": user_cache,
+        "recipients": recipient_cache,
+        "access_tokens": access_token_cache,
+        "refresh_tokens": refresh_token_cache,
+    }
+    writer.family("cache_entries", "gauge", "Entries held by each in-process cache.")
+    for name, cache in caches.items():
+        writer.sample("cache_entries", len(cache), cache=name)
+    writer.family("cache_hits_total", "counter", "Cache lookups that found a live entry.")
+    for name, cache in caches.items():
+        writer.sample("cache_hits_total", cache.hits, cache=name)
+    writer.family("cache_misses_total", "counter", "Cache lookups that missed.")
+    for name, cache in caches.items():
+        writer.sample("cache_misses_total", cache.misses, cache=name)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Request, database, event-loop, pool, replica, password-hashing and cache metrics in Prometheus text format."""
+    writer = PrometheusWriter()
+    write_request_metrics(writer)
+    _write_pool_metrics(writer)
+    _write_replica_metrics(writer)
+    _write_password_hasher_metrics(writer)
+    _write_cache_metrics(writer)
+    writer.scalar("inbox_streams_open", "gauge", "Inbox event streams open on this worker.", inbox_broker.stats()["streams"])
+    return PlainTextResponse(writer.render(), media_type=PrometheusWriter.CONTENT_TYPE)
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field, ConfigDict
-from datetime import datetime
-from typing import Optional
+from pydantic import BaseModel, Field, ConfigDict, model_validator
+from datetime import datetime, timezone
+from typing import List, Optional
 import uuid
 
 class MessageCreate(BaseModel):
@@ -14,5 +14,36 @@ class MessageResponse(BaseModel):
     
     model_config = ConfigDict(from_attributes=True)
 
+class MessagePage(BaseModel):
+    """Schema for a page of messages, newest first."""
+    items: List[MessageResponse]
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` to fetch the next page; null on the last page")
+
 class MessageAcceptanceToggle(BaseModel):
-    is_accepting_messages: bool = Field(..., description="Whether to accept anonymous messages")
\ No newline at end of file
+    is_accepting_messages: bool = Field(..., description="Whether to accept anonymous messages")
+
+class MessageSearchResult(MessageResponse):
+    """Schema for a message matched by full-text search."""
+    rank: float
+
+class MessageSearchPage(BaseModel):
+    """Schema for a page of search results, best match first."""
+    items: List[MessageSearchResult]
+    next_offset: Optional[int] = Field(None, description="Pass as `offset` to fetch the next page; null on the last page")
+
+class MessageBulkDelete(BaseModel):
+    """Selects the messages to delete: a list of IDs, everything older than a timestamp, or all."""
+    ids: Optional[List[uuid.UUID]] = Field(None, min_length=1, max_length=1000, description="IDs of messages to delete")
+    older_than: Optional[datetime] = Field(None, description="Delete messages created before this time")
+    all: bool = Field(False, description="Delete every message")
+
+    @model_validator(mode="after")
+    def exactly_one_filter(self):
+        selected = sum([self.ids is not None, self.older_than is not None, self.all])
+        if selected != 1:
+            raise ValueError("Provide exactly one of ids, older_than or all")
+
+        # created_at is stored as naive UTC
+        if self.older_than is not None and self.older_than.tzinfo is not None:
+            self.older_than = self.older_than.astimezone(timezone.utc).replace(tzinfo=None)
+        return self
\ No newline at end of file
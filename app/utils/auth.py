@@ -1,23 +1,48 @@
-from typing import Annotated
+import hmac
+from typing import Annotated, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from jose import JWTError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models.model import User
 from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.tokens import decode_access_token
 
 # Security scheme for Bearer token
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Detached User snapshots keyed by user id. Invalidate whenever a user row is changed
+user_cache: TTLCache[User] = TTLCache(max_size=settings.user_cache_max_size, ttl=settings.user_cache_ttl_seconds)
+
+async def require_ops_token(
+    credentials: Annotated[Optional[HTTPAuthorizationCredentials], Depends(optional_security)]
+):
+    """
+    Dependency guarding the operational endpoints. They expose internal state, so
+    they answer only requests bearing settings.ops_token, and look absent otherwise.
+    """
+    if (
+        not settings.ops_token
+        or credentials is None
+        or not hmac.compare_digest(credentials.credentials.encode(), settings.ops_token.encode())
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not Found"
+        )
 
 async def get_current_user(
     credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
-    db: Annotated[Session, Depends(get_db)]
+    db: Annotated[AsyncSession, Depends(get_db)]
 ) -> User:
     """
     Dependency to get the current authenticated user from JWT token.
-    Validates token and retrieves user from database.
+    Validates token and retrieves user from the user cache or the database.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -29,12 +54,8 @@ async def get_current_user(
         # Extract token from credentials
         token = credentials.credentials
         
-        # Decode JWT token
-        payload = jwt.decode(
-            token, 
-            settings.secret_key, 
-            algorithms=[settings.algorithm]
-        )
+        # Decode JWT token (verified payloads are cached until the token expires)
+        payload = decode_access_token(token)
         
         # Verify token type is access token
         token_type: str = payload.get("type")
@@ -51,13 +72,21 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
+    # Serve from cache; merge(load=False) attaches a private copy to this session without a query
+    cached_user = user_cache.get(user_id)
+    if cached_user is not None:
+        return await db.merge(cached_user, load=False)
+    
     # Fetch user from database
-    user = db.query(User).filter(User.id == user_id).first()
+    user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
     
     if user is None:
         raise credentials_exception
     
-    return user
+    # Cache the loaded instance detached, and hand the request its own attached copy
+    db.expunge(user)
+    user_cache.set(user_id, user)
+    return await db.merge(user, load=False)
 
 async def get_current_verified_user(
     current_user: Annotated[User, Depends(get_current_user)]
@@ -0,0 +1,126 @@
+import json
+import logging
+import time
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, func, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.model import User
+from app.utils.bloom import BloomFilter
+from app.utils.notifications import notification_listener
+from app.utils.periodic import PeriodicTask
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# NOTIFY channel announcing each registration to the filters on every worker
+REGISTRATIONS_CHANNEL = "user_registrations"
+
+
+class AvailabilityFilter:
+    """
+    In-memory Bloom filters over lower-cased usernames and emails, used as a
+    prefilter for the signup availability checks: a negative answer means the
+    value is free without touching Postgres, a positive one falls through to
+    an indexed lookup.
+    The filters are rebuilt from the users table periodically, and every worker
+    adds each registration as its NOTIFY arrives. They only answer at all while
+    that holds: from a rebuild that started with the listener connected, until
+    the listener drops. Otherwise a name taken on another worker, or during the
+    rebuild, could be reported free. Until then every check queries Postgres.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.ready = False
+        self._listening = False
+        # Bumped whenever the listener connects or drops, to tell whether it stayed up through a rebuild
+        self._listen_epoch = 0
+        # Registrations seen while a rebuild is running; its snapshot may predate them
+        self._added_during_rebuild: Optional[List[Tuple[str, str]]] = None
+        self._usernames = BloomFilter(capacity, error_rate)
+        self._emails = BloomFilter(capacity, error_rate)
+
+    def set_listening(self, listening: bool):
+        self._listening = listening
+        self._listen_epoch += 1
+        if not listening:
+            self.ready = False
+        elif not self.ready:
+            # Registrations published before now were missed; a fresh snapshot covers them
+            availability_filter_rebuilder.wake()
+
+    async def rebuild(self):
+        started = time.perf_counter()
+        listening, epoch = self._listening, self._listen_epoch
+        self._added_during_rebuild = []
+        try:
+            usernames, emails, user_count = await self._build()
+            for username, email in self._added_during_rebuild:
+                usernames.add(username)
+                emails.add(email)
+        finally:
+            self._added_during_rebuild = None
+
+        self._usernames, self._emails = usernames, emails
+        self.ready = listening and epoch == self._listen_epoch
+        logger.info(
+            f"Availability filter rebuilt with {user_count} users in {time.perf_counter() - started:.2f}s"
+            f"{'' if self.ready else '; not in use until registrations can be followed'}"
+        )
+
+    async def _build(self) -> Tuple[BloomFilter, BloomFilter, int]:
+        async with AsyncSessionLocal() as db:
+            user_count = (await db.execute(select(func.count()).select_from(User))).scalar_one()
+            # Leave headroom for registrations until the next rebuild
+            capacity = max(self.capacity, user_count * 2)
+            usernames = BloomFilter(capacity, self.error_rate)
+            emails = BloomFilter(capacity, self.error_rate)
+
+            result = await db.stream(
+                select(func.lower(User.username), func.lower(User.email)).execution_options(yield_per=5000)
+            )
+            async for username, email in result:
+                usernames.add(username)
+                emails.add(email)
+        return usernames, emails, user_count
+
+    def add_user(self, username: str, email: str):
+        username, email = username.lower(), email.lower()
+        self._usernames.add(username)
+        self._emails.add(email)
+        if self._added_during_rebuild is not None:
+            self._added_during_rebuild.append((username, email))
+
+    def on_registration(self, payload: str):
+        registration = json.loads(payload)
+        self.add_user(registration["username"], registration["email"])
+
+    def might_have_username(self, username: str) -> bool:
+        return not self.ready or username.lower() in self._usernames
+
+    def might_have_email(self, email: str) -> bool:
+        return not self.ready or email.lower() in self._emails
+
+availability_filter = AvailabilityFilter(
+    capacity=settings.availability_filter_capacity,
+    error_rate=settings.availability_filter_error_rate
+)
+
+availability_filter_rebuilder = PeriodicTask(
+    "availability-filter-rebuild",
+    interval=settings.availability_filter_rebuild_interval_seconds,
+    job=availability_filter.rebuild,
+    run_immediately=True
+)
+
+notification_listener.subscribe(REGISTRATIONS_CHANNEL, availability_filter.on_registration, availability_filter.set_listening)
+
+async def announce_registration(db: AsyncSession, username: str, email: str):
+    """Queue the NOTIFY adding a new user to every worker's filter; it goes out when the caller's transaction commits."""
+    payload = json.dumps({"username": username.lower(), "email": email.lower()})
+    await db.execute(select(func.pg_notify(literal(REGISTRATIONS_CHANNEL), literal(payload))))
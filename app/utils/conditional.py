@@ -0,0 +1,61 @@
+import uuid
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import func
+
+from app.models.model import User
+
+def bump_inbox_version() -> Dict[str, Any]:
+    """UPDATE values marking a user's inbox as changed; use them wherever messages are added or removed."""
+    return {
+        "inbox_version": User.inbox_version + 1,
+        "inbox_updated_at": func.timezone("utc", func.now()),
+    }
+
+def inbox_validators(user_id: uuid.UUID, version: int, updated_at: datetime) -> Dict[str, str]:
+    """
+    ETag/Last-Modified headers for an inbox response. The ETag includes the user id:
+    versions are per user, and a browser cache is shared by whoever logs in next.
+    """
+    return {
+        "ETag": f'W/"{user_id.hex}.{version}"',
+        "Last-Modified": format_datetime(updated_at.replace(tzinfo=timezone.utc), usegmt=True),
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization",
+    }
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def is_not_modified(request: Request, validators: Dict[str, str], updated_at: datetime) -> bool:
+    """
+    Evaluate If-None-Match / If-Modified-Since against the current validators.
+    If-None-Match wins when both are sent, and uses weak comparison.
+
+    HTTP dates have one-second resolution, so a date equal to the second of the
+    last change can't prove the client saw it: another message may have arrived
+    later that second. Only a strictly later date gets a 304.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        current = validators["ETag"].removeprefix("W/")
+        return any(tag.strip().removeprefix("W/") == current for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        since = _parse_http_date(if_modified_since)
+        return since is not None and updated_at.replace(tzinfo=timezone.utc, microsecond=0) < since
+
+    return False
+
+def not_modified(validators: Dict[str, str]) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators)
@@ -0,0 +1,35 @@
+import hashlib
+import re
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.config import settings
+from app.models.model import utcnow_naive
+
+# What POST /u/{username} does with a duplicate: 409, or a 201 without storing it (the default;
+# a 409 would confirm to anyone that someone else already sent that text)
+DUPLICATE_REJECT = "reject"
+DUPLICATE_COLLAPSE = "collapse"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class DuplicateMessage(Exception):
+    """The recipient already got a message with the same fingerprint within the duplicate window."""
+
+
+def normalize_content(content: str) -> str:
+    """Fold the variations floods use to dodge exact matching: Unicode compatibility forms, case, whitespace."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", content).casefold()).strip()
+
+def content_fingerprint(content: str) -> int:
+    """First 8 bytes of the SHA-256 of the normalized content, as a signed BIGINT."""
+    digest = hashlib.sha256(normalize_content(content).encode()).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+def duplicate_window_start() -> Optional[datetime]:
+    """Messages created since then count as duplicates; None when the check is disabled."""
+    if settings.duplicate_feedback_window_seconds <= 0:
+        return None
+    return utcnow_naive() - timedelta(seconds=settings.duplicate_feedback_window_seconds)
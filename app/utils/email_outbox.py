@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import random
+from datetime import timedelta
+from email.message import EmailMessage
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.model import EmailOutbox, utcnow_naive
+from app.utils.email_service import email_service
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+VERIFICATION_EMAIL = "verification"
+WELCOME_EMAIL = "welcome"
+
+# Outbox kind -> EmailService builder; called as builder(email=recipient, **payload)
+_BUILDERS: Dict[str, Callable[..., EmailMessage]] = {
+    VERIFICATION_EMAIL: email_service.verification_email,
+    WELCOME_EMAIL: email_service.welcome_email,
+}
+
+def enqueue_email(db: AsyncSession, kind: str, recipient: str, **payload: Any) -> EmailOutbox:
+    """
+    Add an email to the outbox as part of the caller's transaction.
+    It is only dispatched once that transaction commits.
+    """
+    if kind not in _BUILDERS:
+        raise ValueError(f"Unknown email kind: {kind}")
+
+    entry = EmailOutbox(kind=kind, recipient=recipient, payload=payload)
+    db.add(entry)
+    return entry
+
+
+class EmailOutboxDispatcher:
+    """
+    Background task that drains the email outbox in batches.
+    Rows are claimed with FOR UPDATE SKIP LOCKED so several workers can run a
+    dispatcher side by side. Sent rows are deleted; failed sends are retried with
+    exponential backoff until max_attempts, after which the row is marked failed.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        poll_interval: float,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="email-outbox-dispatcher")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        """Signal that new outbox rows were committed, skipping the poll delay."""
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await self.dispatch_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox dispatch failed: {str(e)}", exc_info=True)
+                processed = 0
+
+            # A full batch means there is probably more work waiting
+            if processed >= self.batch_size:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    async def dispatch_batch(self) -> int:
+        """Send one batch of due emails. Returns the number of rows processed."""
+        async with AsyncSessionLocal() as db:
+            entries = (await db.execute(
+                select(EmailOutbox)
+                .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= utcnow_naive())
+                .order_by(EmailOutbox.next_attempt_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )).scalars().all()
+
+            if not entries:
+                return 0
+
+            results: List[Optional[Exception]] = [None] * len(entries)
+            outgoing = []
+            for index, entry in enumerate(entries):
+                try:
+                    outgoing.append((index, _BUILDERS[entry.kind](email=entry.recipient, **entry.payload)))
+                except Exception as e:
+                    results[index] = e
+
+            # The whole batch goes out over pooled connections, several messages per connection
+            sent = await email_service.send_many([message for _, message in outgoing])
+            for (index, _), result in zip(outgoing, sent):
+                results[index] = result
+
+            for entry, result in zip(entries, results):
+                if result is None:
+                    await db.delete(entry)
+                    continue
+
+                entry.attempts += 1
+                entry.last_error = str(result)
+                if entry.attempts >= self.max_attempts:
+                    entry.status = "failed"
+                    logger.error(f"Giving up on {entry.kind} email to {entry.recipient} after {entry.attempts} attempts: {result}")
+                else:
+                    entry.next_attempt_at = utcnow_naive() + timedelta(seconds=self._backoff(entry.attempts))
+                    logger.warning(f"Error sending {entry.kind} email to {entry.recipient} (attempt {entry.attempts}): {result}")
+
+            await db.commit()
+
+        return len(entries)
+
+email_dispatcher = EmailOutboxDispatcher(
+    batch_size=settings.email_outbox_batch_size,
+    poll_interval=settings.email_outbox_poll_interval_seconds,
+    max_attempts=settings.email_outbox_max_attempts,
+    backoff_base=settings.email_outbox_backoff_base_seconds,
+    backoff_max=settings.email_outbox_backoff_max_seconds
+)
@@ -1,74 +1,66 @@
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
+import asyncio
+import html
+import logging
+import time
+from email.message import EmailMessage
+from email.utils import formataddr, formatdate, make_msgid
+from string import Template
+from typing import Any, List, NamedTuple, Optional, Sequence
+
+from aiosmtplib import SMTP, SMTPException, SMTPServerDisconnected
+
 from app.config import settings
-from pydantic import EmailStr
 
-class EmailService:
-    def __init__(self):
-        self.conf = ConnectionConfig(
-            MAIL_USERNAME="resend",
-            MAIL_PASSWORD=settings.resend_api_key,
-            MAIL_FROM=f"noreply@{settings.mail_from}",
-            MAIL_PORT=587,
-            MAIL_SERVER="smtp.resend.com",
-            MAIL_FROM_NAME=settings.mail_from_name,
-            MAIL_STARTTLS=True,
-            MAIL_SSL_TLS=False,
-            USE_CREDENTIALS=True,
-            VALIDATE_CERTS=True
-        )
-        self.fast_mail = FastMail(self.conf)
+# Configure logging
+logger = logging.getLogger(__name__)
+
 
-    async def send_verification_email(self, email: EmailStr, username: str, verification_token: str):
-        verification_link = f"{settings.backend_url}/auth/verify-email?token={verification_token}"
+class EmailTemplate(NamedTuple):
+    subject: str
+    html: Template
 
-        html_content = f"""
+# Parsed once at import; rendering is a single substitute() per email
+VERIFICATION_TEMPLATE = EmailTemplate(
+    subject="Verify your email address - Anonymous Feedback",
+    html=Template("""
         <html>
             <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
                 <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
                     <h2 style="color: #4F46E5;">Welcome to Anonymous Feedback!</h2>
-                    <p>Hi {username},</p>
+                    <p>Hi $username,</p>
                     <p>Thank you for registering with Anonymous Feedback. Please verify your email address to activate your account.</p>
                     <p style="margin: 30px 0;">
-                        <a href="{verification_link}" 
+                        <a href="$verification_link"
                             style="background-color: #4F46E5; color: white; padding: 12px 30px; text-decoration: none; border-radius: 5px; display: inline-block;">
                             Verify Email Address
                         </a>
                     </p>
                     <p>Or copy and paste this link in your browser:</p>
-                    <p style="word-break: break-all; color: #666;">{verification_link}</p>
+                    <p style="word-break: break-all; color: #666;">$verification_link</p>
                     <p style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; color: #666; font-size: 12px;">
-                        This link will expire in {settings.verification_token_expire_hours} hours.<br>
+                        This link will expire in $expire_hours hours.<br>
                         If you didn't create an account, please ignore this email.
                     </p>
                 </div>
             </body>
         </html>
-        """
-
-        message = MessageSchema(
-            subject="Verify your email address - Anonymous Feedback",
-            recipients=[email],
-            body=html_content,
-            subtype=MessageType.html
-        )
+        """)
+)
 
-        await self.fast_mail.send_message(message)
-
-    async def send_welcome_email(self, email: EmailStr, username: str):
-        profile_link = f"{settings.frontend_url}/u/{username}"
-        
-        html_content = f"""
+WELCOME_TEMPLATE = EmailTemplate(
+    subject="Welcome to Anonymous Feedback!",
+    html=Template("""
         <html>
             <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
                 <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
                     <h2 style="color: #4F46E5;">Welcome to Anonymous Feedback! 🎉</h2>
-                    <p>Hi {username},</p>
+                    <p>Hi $username,</p>
                     <p>Your email has been verified successfully! Your account is now active.</p>
                     <p>Your unique feedback link is:</p>
                     <p style="margin: 20px 0;">
-                        <a href="{profile_link}" 
+                        <a href="$profile_link"
                             style="background-color: #4F46E5; color: white; padding: 12px 30px; text-decoration: none; border-radius: 5px; display: inline-block;">
-                            {profile_link}
+                            $profile_link
                         </a>
                     </p>
                     <p>Share this link with others to receive anonymous feedback!</p>
@@ -86,15 +78,212 @@ class EmailService:
                 </div>
             </body>
         </html>
+        """)
+)
+
+
+class _PooledConnection:
+    __slots__ = ("client", "last_used", "messages_sent")
+
+    def __init__(self, client: SMTP):
+        self.client = client
+        self.last_used = time.monotonic()
+        self.messages_sent = 0
+
+
+class SMTPConnectionPool:
+    """
+    Authenticated SMTP connections kept open between sends, so an email doesn't
+    pay for its own TCP + STARTTLS + AUTH handshake. At most `size` connections
+    are in use at once. A connection idle for longer than `keepalive` seconds is
+    probed with NOOP before reuse and replaced if the server dropped it; one that
+    has sent `max_messages` is retired, as servers cap messages per session.
+    """
+
+    def __init__(self, size: int, keepalive: float, max_messages: int, timeout: float):
+        self.size = size
+        self.keepalive = keepalive
+        self.max_messages = max_messages
+        self.timeout = timeout
+        # LIFO, so the most recently used (least likely to have been dropped) goes out first
+        self._idle: List[_PooledConnection] = []
+        self._slots = asyncio.Semaphore(size)
+        self.connects = 0
+        self.reconnects = 0
+
+    async def _connect(self) -> _PooledConnection:
+        client = SMTP(
+            hostname=settings.mail_server,
+            port=settings.mail_port,
+            # With credentials set, connect() also logs in
+            username=settings.mail_username if settings.mail_use_credentials else None,
+            password=settings.resend_api_key if settings.mail_use_credentials else None,
+            use_tls=settings.mail_ssl_tls,
+            start_tls=settings.mail_starttls,
+            validate_certs=settings.mail_validate_certs,
+            timeout=self.timeout
+        )
+        await client.connect()
+        self.connects += 1
+        return _PooledConnection(client)
+
+    async def _checkout(self) -> _PooledConnection:
+        while self._idle:
+            conn = self._idle.pop()
+            if time.monotonic() - conn.last_used < self.keepalive:
+                return conn
+            try:
+                await conn.client.noop()
+                return conn
+            except (SMTPException, OSError):
+                conn.client.close()
+                self.reconnects += 1
+        return await self._connect()
+
+    async def _release(self, conn: _PooledConnection):
+        if conn.messages_sent >= self.max_messages or not conn.client.is_connected:
+            await self._quit(conn)
+            return
+        conn.last_used = time.monotonic()
+        self._idle.append(conn)
+
+    @staticmethod
+    async def _quit(conn: _PooledConnection):
+        try:
+            await conn.client.quit()
+        except (SMTPException, OSError):
+            conn.client.close()
+
+    async def send_batch(self, messages: Sequence[EmailMessage]) -> List[Optional[Exception]]:
         """
-        
-        message = MessageSchema(
-            subject="Welcome to Anonymous Feedback!",
-            recipients=[email],
-            body=html_content,
-            subtype=MessageType.html
+        Send messages back to back over one connection. Returns, per message, None
+        if the server accepted it or the error. A connection the server drops is
+        replaced once per message; if no connection can be made, the rest of the
+        batch fails with that error rather than retrying each message.
+        """
+        results: List[Optional[Exception]] = []
+        async with self._slots:
+            conn: Optional[_PooledConnection] = None
+            try:
+                for message in messages:
+                    try:
+                        if conn is None:
+                            conn = await self._checkout()
+                        try:
+                            await conn.client.send_message(message)
+                        except SMTPServerDisconnected:
+                            conn.client.close()
+                            conn = None
+                            conn = await self._connect()
+                            self.reconnects += 1
+                            await conn.client.send_message(message)
+                        conn.messages_sent += 1
+                        results.append(None)
+                    except (SMTPException, OSError) as e:
+                        results.append(e)
+                        if conn is None:
+                            results.extend([e] * (len(messages) - len(results)))
+                            break
+                        if not conn.client.is_connected:
+                            conn = None
+
+                    if conn is not None and conn.messages_sent >= self.max_messages:
+                        await self._release(conn)
+                        conn = None
+            except BaseException:
+                # Cancelled mid-conversation: the session state is unknown, don't reuse it
+                if conn is not None:
+                    conn.client.close()
+                raise
+
+            if conn is not None:
+                await self._release(conn)
+        return results
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await self._quit(conn)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+        }
+
+
+class EmailService:
+    def __init__(self):
+        # The connection pool is built by start() (called from the app lifespan) or on first send;
+        # connections are opened on demand
+        self._pool: Optional[SMTPConnectionPool] = None
+
+    def start(self):
+        if self._pool is not None:
+            return
+        self._pool = SMTPConnectionPool(
+            size=settings.mail_pool_size,
+            keepalive=settings.mail_keepalive_seconds,
+            max_messages=settings.mail_max_messages_per_connection,
+            timeout=settings.mail_timeout_seconds
+        )
+
+    async def stop(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    @property
+    def pool(self) -> SMTPConnectionPool:
+        self.start()
+        return self._pool
+
+    def _compose(self, recipient: str, template: EmailTemplate, **values: Any) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = formataddr((settings.mail_from_name, f"noreply@{settings.mail_from}"))
+        message["To"] = recipient
+        message["Subject"] = template.subject
+        message["Date"] = formatdate()
+        message["Message-ID"] = make_msgid(domain=settings.mail_from)
+        message.set_content(
+            template.html.substitute({name: html.escape(str(value)) for name, value in values.items()}),
+            subtype="html"
         )
-        
-        await self.fast_mail.send_message(message)
+        return message
+
+    def verification_email(self, email: str, username: str, verification_token: str) -> EmailMessage:
+        return self._compose(
+            email, VERIFICATION_TEMPLATE,
+            username=username,
+            verification_link=f"{settings.backend_url}/auth/verify-email?token={verification_token}",
+            expire_hours=settings.verification_token_expire_hours
+        )
+
+    def welcome_email(self, email: str, username: str) -> EmailMessage:
+        return self._compose(
+            email, WELCOME_TEMPLATE,
+            username=username,
+            profile_link=f"{settings.frontend_url}/u/{username}"
+        )
+
+    async def send_many(self, messages: Sequence[EmailMessage]) -> List[Optional[Exception]]:
+        """
+        Send messages over pooled connections: split into at most pool-size runs,
+        each pushed back to back over a single connection. Returns None or the
+        error for each message, in order.
+        """
+        if not messages:
+            return []
+        run_length = -(-len(messages) // min(self.pool.size, len(messages)))
+        runs = [messages[start:start + run_length] for start in range(0, len(messages), run_length)]
+        results = await asyncio.gather(*[self.pool.send_batch(run) for run in runs])
+        return [result for run in results for result in run]
+
+    async def send(self, message: EmailMessage):
+        error = (await self.send_many([message]))[0]
+        if error is not None:
+            raise error
 
-email_service = EmailService()
\ No newline at end of file
+email_service = EmailService()
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import column, exists, func, insert, select, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.model import User, Message, utcnow_naive
+from app.utils.duplicates import DuplicateMessage, content_fingerprint, duplicate_window_start
+from app.utils.inbox_events import emit, message_created
+from app.utils.message_counts import apply_message_count_deltas
+from app.utils.recipients import NewMessage
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class PendingMessage(NamedTuple):
+    id: uuid.UUID
+    recipient_id: uuid.UUID
+    content: str
+    created_at: datetime
+    content_hash: int
+    future: "asyncio.Future[bool]"
+
+
+async def find_duplicates(
+    db: AsyncSession, batch: List[PendingMessage], since: datetime
+) -> Tuple[Set[uuid.UUID], Dict[uuid.UUID, uuid.UUID]]:
+    """
+    Ids of the messages in `batch` that duplicate one stored since `since`, and
+    the later copies of a message repeated within the batch itself, mapped to the
+    id of its first copy. Stored copies are found with one query probing the
+    duplicate index once per distinct (recipient, fingerprint).
+    """
+    repeats = {}
+    first_copies = {}
+    for message in batch:
+        key = (message.recipient_id, message.content_hash)
+        if key in first_copies:
+            repeats[message.id] = first_copies[key]
+        else:
+            first_copies[key] = message.id
+    keys = first_copies.keys()
+
+    probes = func.unnest(
+        bindparam("probe_recipient_ids", [recipient_id for recipient_id, _ in keys], type_=ARRAY(Message.recipient_id.type)),
+        bindparam("probe_content_hashes", [content_hash for _, content_hash in keys], type_=ARRAY(Message.content_hash.type)),
+    ).table_valued(
+        column("recipient_id", Message.recipient_id.type),
+        column("content_hash", Message.content_hash.type),
+        name="probes"
+    ).render_derived()
+    stored_keys = set((await db.execute(
+        select(probes.c.recipient_id, probes.c.content_hash).where(exists().where(
+            Message.recipient_id == probes.c.recipient_id,
+            Message.content_hash == probes.c.content_hash,
+            Message.created_at >= since
+        ))
+    )).all())
+
+    duplicates = {message.id for message in batch if (message.recipient_id, message.content_hash) in stored_keys}
+    return duplicates, repeats
+
+async def write_message_batch(db: AsyncSession, batch: List[PendingMessage]) -> Tuple[Set[uuid.UUID], Set[uuid.UUID]]:
+    """
+    Write a batch of messages with one multi-row INSERT and one counter UPDATE.
+    Rows are passed as arrays and expanded with unnest(), so the statement is the
+    same (and stays prepared) whatever the batch size. Like insert_message, the
+    INSERT re-validates each recipient, duplicates are dropped, and inbox events
+    are emitted for the stored messages. Returns the ids stored and the ids
+    dropped as duplicates.
+
+    A message repeated within the batch only counts as a duplicate if its first
+    copy was stored; if the recipient rejected that one, the repeats share its
+    outcome (neither stored nor duplicate), as they would have sent one by one.
+    """
+    since = duplicate_window_start()
+    duplicates, repeats = await find_duplicates(db, batch, since) if since is not None else (set(), {})
+    batch = [message for message in batch if message.id not in duplicates and message.id not in repeats]
+
+    incoming = func.unnest(
+        bindparam("ids", [message.id for message in batch], type_=ARRAY(Message.id.type)),
+        bindparam("recipient_ids", [message.recipient_id for message in batch], type_=ARRAY(Message.recipient_id.type)),
+        bindparam("contents", [message.content for message in batch], type_=ARRAY(Message.content.type)),
+        bindparam("created_ats", [message.created_at for message in batch], type_=ARRAY(Message.created_at.type)),
+        bindparam("content_hashes", [message.content_hash for message in batch], type_=ARRAY(Message.content_hash.type)),
+    ).table_valued(
+        column("id", Message.id.type),
+        column("recipient_id", Message.recipient_id.type),
+        column("content", Message.content.type),
+        column("created_at", Message.created_at.type),
+        column("content_hash", Message.content_hash.type),
+        name="incoming"
+    ).render_derived()
+
+    inserted = (await db.execute(
+        insert(Message)
+        .from_select(
+            ["id", "recipient_id", "content", "created_at", "content_hash"],
+            select(incoming.c.id, incoming.c.recipient_id, incoming.c.content, incoming.c.created_at, incoming.c.content_hash)
+            .join(User, User.id == incoming.c.recipient_id)
+            .where(User.is_verified, User.is_accepting_messages)
+        )
+        .returning(Message.id, Message.recipient_id)
+    )).all()
+
+    await apply_message_count_deltas(db, Counter(recipient_id for _, recipient_id in inserted))
+
+    stored = {message_id for message_id, _ in inserted}
+    duplicates.update(message_id for message_id, first_id in repeats.items() if first_id in stored)
+    await emit(db, *(
+        message_created(NewMessage(message.id, message.recipient_id, message.content, message.created_at))
+        for message in batch if message.id in stored
+    ))
+    return stored, duplicates
+
+
+class FeedbackBatcher:
+    """
+    Write-behind buffer for POST /u/{username}, used when feedback_batching_enabled is set.
+    Accepted messages are queued and flushed every `max_delay` seconds or `max_rows`
+    rows, whichever comes first, in a single transaction. submit() resolves only
+    after the transaction holding the message has committed, so a 201 still means
+    the message is durable.
+    """
+
+    def __init__(self, max_rows: int, max_delay: float):
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self._pending: List[PendingMessage] = []
+        self._not_empty = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="feedback-batcher")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # Don't strand callers waiting on the buffer
+        if self._flushing is not None:
+            await self._flushing
+        while self._pending:
+            await self._flush(self._take_batch())
+
+    async def submit(self, recipient_id: uuid.UUID, content: str) -> bool:
+        """
+        Queue a message and wait for its batch to commit. Returns False if the
+        recipient rejected it; raises DuplicateMessage if it was dropped as a duplicate.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(PendingMessage(
+            uuid.uuid4(), recipient_id, content, utcnow_naive(), content_fingerprint(content), future
+        ))
+        self._not_empty.set()
+        if len(self._pending) >= self.max_rows:
+            self._full.set()
+        return await future
+
+    def _take_batch(self) -> List[PendingMessage]:
+        batch, self._pending = self._pending[:self.max_rows], self._pending[self.max_rows:]
+        if not self._pending:
+            self._not_empty.clear()
+        if len(self._pending) < self.max_rows:
+            self._full.clear()
+        return batch
+
+    async def _run(self):
+        while True:
+            await self._not_empty.wait()
+
+            # Let the batch fill up for at most max_delay
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.max_delay)
+            except asyncio.TimeoutError:
+                pass
+
+            # Shielded so stop() can't abandon a batch halfway through its transaction
+            self._flushing = asyncio.create_task(self._flush(self._take_batch()))
+            await asyncio.shield(self._flushing)
+            self._flushing = None
+
+    async def _flush(self, batch: List[PendingMessage]):
+        try:
+            async with AsyncSessionLocal() as db:
+                stored, duplicates = await write_message_batch(db, batch)
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Error flushing feedback batch of {len(batch)} messages: {str(e)}", exc_info=True)
+            for message in batch:
+                if not message.future.done():
+                    message.future.set_exception(e)
+            return
+
+        for message in batch:
+            if message.future.done():
+                continue
+            if message.id in duplicates:
+                message.future.set_exception(DuplicateMessage())
+            else:
+                message.future.set_result(message.id in stored)
+
+feedback_batcher = FeedbackBatcher(
+    max_rows=settings.feedback_batch_max_rows,
+    max_delay=settings.feedback_batch_max_delay_ms / 1000
+)
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, Set
+
+from sqlalchemy import Text, bindparam, event, func, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.utils.notifications import notification_listener
+from app.utils.recipients import NewMessage
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+MESSAGE_CREATED = "message.created"
+MESSAGE_DELETED = "message.deleted"
+MESSAGES_DELETED = "messages.deleted"
+# Sent instead of the events a slow subscriber missed; the client should refetch
+RESYNC = "resync"
+
+# LISTEN/NOTIFY channel for the postgres backend
+CHANNEL = "inbox_events"
+
+# Session.info key holding events waiting for the transaction to commit (memory backend)
+_PENDING_KEY = "inbox_events"
+
+InboxEvent = Dict[str, Any]
+
+
+def message_created(message: NewMessage) -> InboxEvent:
+    return {
+        "user_id": str(message.recipient_id),
+        "type": MESSAGE_CREATED,
+        "data": {"id": str(message.id), "content": message.content, "created_at": message.created_at.isoformat()}
+    }
+
+def message_deleted(user_id: uuid.UUID, message_id: uuid.UUID) -> InboxEvent:
+    return {"user_id": str(user_id), "type": MESSAGE_DELETED, "data": {"id": str(message_id)}}
+
+def messages_deleted(user_id: uuid.UUID, count: int) -> InboxEvent:
+    # Bulk deletes only carry the count; ids could exceed the NOTIFY payload limit
+    return {"user_id": str(user_id), "type": MESSAGES_DELETED, "data": {"count": count}}
+
+
+class InboxBroker:
+    """Fans events out to the inbox streams open on this worker, one bounded queue per stream."""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+    def subscribe(self, user_id: uuid.UUID) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[str(user_id)].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: uuid.UUID, queue: asyncio.Queue):
+        queues = self._subscribers.get(str(user_id))
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[str(user_id)]
+
+    def deliver(self, event: InboxEvent):
+        for queue in self._subscribers.get(event["user_id"], ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Never block writers on a slow reader: drop its backlog and ask it to refetch
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"user_id": event["user_id"], "type": RESYNC, "data": {}})
+
+    def resync_all(self):
+        """Tell every open stream to refetch, e.g. after events may have been missed."""
+        for user_id in list(self._subscribers):
+            self.deliver({"user_id": user_id, "type": RESYNC, "data": {}})
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "users": len(self._subscribers),
+            "streams": sum(len(queues) for queues in self._subscribers.values())
+        }
+
+inbox_broker = InboxBroker(queue_size=settings.inbox_events_queue_size)
+
+
+async def emit(db: AsyncSession, *events: InboxEvent):
+    """
+    Publish inbox events as part of the caller's transaction; subscribers only see
+    them once it commits. The postgres backend sends them with pg_notify (one
+    statement per call), the memory backend holds them until the session commits.
+    """
+    if not events:
+        return
+
+    if settings.inbox_events_backend == "postgres":
+        payloads = func.unnest(
+            bindparam("inbox_payloads", [json.dumps(e, ensure_ascii=False) for e in events], type_=ARRAY(Text))
+        ).table_valued("payload").render_derived()
+        await db.execute(select(func.pg_notify(literal(CHANNEL), payloads.c.payload)))
+    else:
+        db.info.setdefault(_PENDING_KEY, []).extend(events)
+
+@event.listens_for(Session, "after_commit")
+def _deliver_pending(session: Session):
+    for pending in session.info.pop(_PENDING_KEY, ()):
+        inbox_broker.deliver(pending)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _deliver_notification(payload: str):
+    inbox_broker.deliver(json.loads(payload))
+
+def _on_listening(listening: bool):
+    # Streams miss whatever was published while disconnected; tell them to refetch
+    if not listening:
+        inbox_broker.resync_all()
+
+# For the postgres backend: every notification goes to this worker's broker
+if settings.inbox_events_backend == "postgres":
+    notification_listener.subscribe(CHANNEL, _deliver_notification, _on_listening)
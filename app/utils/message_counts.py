@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import uuid
+from typing import Mapping, Union
+
+from sqlalchemy import ColumnElement, Update, bindparam, column, select, update, func
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal, init_async_engine, dispose_engines, set_maintenance_timeout
+from app.models.model import User, Message
+from app.utils.conditional import bump_inbox_version
+from app.utils.periodic import PeriodicTask
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def adjust_message_count(
+    user_id: Union[uuid.UUID, ColumnElement],
+    delta: Union[int, ColumnElement]
+) -> Update:
+    """
+    UPDATE that atomically shifts a user's denormalized message counter and bumps
+    the inbox version that conditional GETs validate against.
+    Both arguments may be column expressions (e.g. from a CTE or a FROM list) for set-based updates.
+    Execute it in the same transaction as the insert/delete it accounts for.
+    """
+    return (
+        update(User)
+        .where(User.id == user_id)
+        # Keep updated_at for profile changes, not inbox traffic
+        .values(message_count=User.message_count + delta, updated_at=User.updated_at, **bump_inbox_version())
+    )
+
+async def apply_message_count_deltas(db: AsyncSession, deltas: Mapping[uuid.UUID, int]):
+    """
+    Shift many users' counters with one UPDATE joined against unnest()ed (user, delta)
+    arrays; the statement is the same, and stays prepared, whatever the number of users.
+    """
+    if not deltas:
+        return
+
+    counts = func.unnest(
+        bindparam("count_recipient_ids", list(deltas), type_=ARRAY(User.id.type)),
+        bindparam("count_deltas", list(deltas.values()), type_=ARRAY(User.message_count.type)),
+    ).table_valued(
+        column("recipient_id", User.id.type),
+        column("delta", User.message_count.type),
+        name="counts"
+    ).render_derived()
+    await db.execute(
+        adjust_message_count(counts.c.recipient_id, counts.c.delta).execution_options(synchronize_session=False)
+    )
+
+async def reconcile_message_counts(batch_size: int = 1000) -> int:
+    """
+    Repair drift between users.message_count and the actual number of messages.
+    Users are processed in id order, one batch per transaction. Each batch row-locks
+    its users first, so writers that bump the counter (which also lock the user row)
+    cannot interleave with the recount. Returns the number of users corrected.
+    """
+    repaired = 0
+    last_id = None
+
+    while True:
+        async with AsyncSessionLocal() as db:
+            await set_maintenance_timeout(db)
+            query = select(User.id).order_by(User.id).limit(batch_size).with_for_update()
+            if last_id is not None:
+                query = query.where(User.id > last_id)
+            user_ids = (await db.execute(query)).scalars().all()
+
+            if not user_ids:
+                break
+
+            actual = (
+                select(func.count())
+                .select_from(Message)
+                .where(Message.recipient_id == User.id)
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                update(User)
+                .where(User.id.in_(user_ids), User.message_count != actual)
+                .values(message_count=actual, updated_at=User.updated_at, **bump_inbox_version())
+                .returning(User.id)
+                .execution_options(synchronize_session=False)
+            )
+            fixed = result.scalars().all()
+            await db.commit()
+
+        if fixed:
+            logger.warning(f"Reconciled message_count for {len(fixed)} users")
+        repaired += len(fixed)
+        last_id = user_ids[-1]
+
+    return repaired
+
+message_count_reconciler = PeriodicTask(
+    "message-count-reconciler",
+    interval=settings.message_count_reconcile_interval_seconds,
+    job=lambda: reconcile_message_counts(settings.message_count_reconcile_batch_size)
+)
+
+async def _main():
+    init_async_engine()
+    try:
+        repaired = await reconcile_message_counts(settings.message_count_reconcile_batch_size)
+    finally:
+        await dispose_engines()
+    print(f"Repaired {repaired} users")
+
+if __name__ == "__main__":
+    # One-off repair: python -m app.utils.message_counts
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -0,0 +1,270 @@
+import asyncio
+import bisect
+import logging
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds; the last bucket catches everything slower
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, float("inf"))
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, float("inf"))
+
+# Label for requests that matched no route; raw paths would make label values unbounded
+UNMATCHED_ROUTE = "unmatched"
+
+# Responses that stay open indefinitely (the inbox event stream)
+STREAMING_CONTENT_TYPE = b"text/event-stream"
+
+
+class Histogram:
+    """Bucketed observations in the Prometheus histogram shape."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.bucket_counts: List[int] = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+
+
+class RequestStats:
+    """Per-request accumulator, reachable from anywhere in the request through `current_request`."""
+
+    __slots__ = ("scope", "started", "queries", "db_seconds")
+
+    def __init__(self, scope: Dict[str, Any]):
+        self.scope = scope
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        # The router stores the matched route in the (shared) scope before calling the endpoint
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+class Metrics:
+    """In-process registry for request, query and event-loop metrics; rendered by GET /metrics."""
+
+    def __init__(self):
+        self.request_latency: Dict[Tuple[str, str, str], Histogram] = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.request_queries: Dict[Tuple[str, str], Histogram] = defaultdict(lambda: Histogram(QUERY_COUNT_BUCKETS))
+        self.request_db_seconds: Dict[Tuple[str, str], Histogram] = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.active: Set[RequestStats] = set()
+        self.queries_total = 0
+        self.query_seconds_total = 0.0
+        self.loop_lag = Histogram(LOOP_LAG_BUCKETS)
+        self.loop_blocked: Counter = Counter()
+
+    def observe_request(self, stats: RequestStats, status_code: int, seconds: float):
+        method, route = stats.scope["method"], stats.route
+        self.request_latency[(method, route, str(status_code))].observe(seconds)
+        self.request_queries[(method, route)].observe(stats.queries)
+        self.request_db_seconds[(method, route)].observe(stats.db_seconds)
+
+    def in_flight(self) -> Counter:
+        return Counter((stats.scope["method"], stats.route) for stats in self.active)
+
+metrics = Metrics()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    metrics.queries_total += 1
+    metrics.query_seconds_total += elapsed
+
+    # Engine events run in SQLAlchemy's greenlet, which shares the request's context
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    # after_cursor_execute doesn't fire for failed statements
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route latency, in-flight requests and the
+    queries each request issued. Routes are labelled by their template
+    (/u/{username}), never the raw path.
+
+    An event stream is recorded when its response starts and then stops counting
+    as in flight: it stays open for as long as the client listens, which would
+    otherwise fill the latency histogram with hours-long samples and make the
+    event loop monitor blame every stall on it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        metrics.active.add(stats)
+        status_code = 500
+        streaming = False
+
+        async def send_with_status(message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                streaming = any(
+                    name.lower() == b"content-type" and value.startswith(STREAMING_CONTENT_TYPE)
+                    for name, value in message.get("headers", ())
+                )
+                if streaming:
+                    metrics.active.discard(stats)
+                    metrics.observe_request(stats, status_code, time.perf_counter() - stats.started)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_request.reset(token)
+            if not streaming:
+                metrics.active.discard(stats)
+                metrics.observe_request(stats, status_code, time.perf_counter() - stats.started)
+
+
+class EventLoopMonitor:
+    """
+    Measures how late a periodic sleep wakes up. The overshoot is time the loop
+    spent running something else without yielding; past `threshold` the requests
+    in flight at that moment are logged and counted as suspects.
+    """
+
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="event-loop-monitor")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            metrics.loop_lag.observe(lag)
+
+            if lag >= self.threshold:
+                suspects = metrics.in_flight()
+                for key in suspects:
+                    metrics.loop_blocked[key] += 1
+                routes = ", ".join(f"{method} {route}" for method, route in suspects) or "none"
+                logger.warning(f"Event loop blocked for {lag * 1000:.0f}ms; requests in flight: {routes}")
+
+event_loop_monitor = EventLoopMonitor(
+    interval=settings.event_loop_monitor_interval_ms / 1000,
+    threshold=settings.event_loop_block_threshold_ms / 1000
+)
+
+
+class PrometheusWriter:
+    """Accumulates metric families in the Prometheus text exposition format (0.0.4)."""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    @staticmethod
+    def _escape(value: Any) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    def _labels(self, labels: Dict[str, Any]) -> str:
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{name}="{self._escape(value)}"' for name, value in labels.items()) + "}"
+
+    def family(self, name: str, metric_type: str, help_text: str):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {metric_type}")
+
+    def sample(self, name: str, value: float, **labels: Any):
+        self.lines.append(f"{name}{self._labels(labels)} {value}")
+
+    def scalar(self, name: str, metric_type: str, help_text: str, value: float):
+        self.family(name, metric_type, help_text)
+        self.sample(name, value)
+
+    def histogram(self, name: str, help_text: str, series: Iterable[Tuple[Dict[str, Any], Histogram]]):
+        self.family(name, "histogram", help_text)
+        for labels, histogram in series:
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else str(bound)
+                self.sample(f"{name}_bucket", cumulative, **labels, le=le)
+            self.sample(f"{name}_sum", round(histogram.sum, 6), **labels)
+            self.sample(f"{name}_count", histogram.count, **labels)
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+def write_request_metrics(writer: PrometheusWriter):
+    writer.histogram(
+        "http_request_duration_seconds", "Request latency by route template and status.",
+        [({"method": m, "route": r, "status": s}, h) for (m, r, s), h in sorted(metrics.request_latency.items())]
+    )
+    writer.family("http_requests_in_flight", "gauge", "Requests currently being handled.")
+    for (method, route), count in sorted(metrics.in_flight().items()):
+        writer.sample("http_requests_in_flight", count, method=method, route=route)
+    writer.histogram(
+        "http_request_db_queries", "Database queries issued per request.",
+        [({"method": m, "route": r}, h) for (m, r), h in sorted(metrics.request_queries.items())]
+    )
+    writer.histogram(
+        "http_request_db_seconds", "Time per request spent waiting on database queries.",
+        [({"method": m, "route": r}, h) for (m, r), h in sorted(metrics.request_db_seconds.items())]
+    )
+    writer.scalar("db_queries_total", "counter", "Queries executed, including background jobs.", metrics.queries_total)
+    writer.scalar("db_query_seconds_total", "counter", "Time spent in queries, including background jobs.", round(metrics.query_seconds_total, 6))
+    writer.histogram("event_loop_lag_seconds", "Event loop scheduling delay.", [({}, metrics.loop_lag)])
+    writer.family("event_loop_blocked_total", "counter", "Loop stalls over the threshold, by request in flight at the time.")
+    for (method, route), count in sorted(metrics.loop_blocked.items()):
+        writer.sample("event_loop_blocked_total", count, method=method, route=route)
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import asyncpg
+
+from app.config import settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class Subscription(NamedTuple):
+    on_notify: Callable[[str], None]
+    # Called with True once LISTEN is in place and with False when the connection drops;
+    # whatever was published while not listening is missed
+    on_listening: Callable[[bool], None]
+
+
+class NotificationListener:
+    """
+    LISTENs on a dedicated connection (outside the pool) for every channel that
+    has subscribers and hands each payload to them, reconnecting if it drops.
+    One connection per worker, shared by all channels.
+    """
+
+    def __init__(self, reconnect_delay: float):
+        self.reconnect_delay = reconnect_delay
+        self._subscriptions: Dict[str, List[Subscription]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, channel: str, on_notify: Callable[[str], None], on_listening: Callable[[bool], None]):
+        """Register before start(); subscriptions added later wait for the next reconnect."""
+        self._subscriptions.setdefault(channel, []).append(Subscription(on_notify, on_listening))
+
+    def start(self):
+        if self._task is None and self._subscriptions:
+            self._task = asyncio.create_task(self._run(), name="notification-listener")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._set_listening(False)
+
+    def _set_listening(self, listening: bool):
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions:
+                subscription.on_listening(listening)
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str):
+        for subscription in self._subscriptions.get(channel, ()):
+            try:
+                subscription.on_notify(payload)
+            except Exception as e:
+                logger.error(f"Dropping malformed notification on {channel}: {str(e)}")
+
+    async def _run(self):
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(
+                    host=settings.database_hostname,
+                    port=settings.database_port,
+                    user=settings.database_username,
+                    password=settings.database_password,
+                    database=settings.database_name
+                )
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                for channel in self._subscriptions:
+                    await connection.add_listener(channel, self._on_notify)
+                logger.info(f"Listening for notifications on {', '.join(self._subscriptions)}")
+                self._set_listening(True)
+                await closed.wait()
+                logger.warning("Notification listener connection closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notification listener failed: {str(e)}")
+            finally:
+                self._set_listening(False)
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+
+            await asyncio.sleep(self.reconnect_delay)
+
+notification_listener = NotificationListener(reconnect_delay=settings.inbox_events_reconnect_seconds)
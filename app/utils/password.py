@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.config import settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Worker functions must be module-level so the process pool can pickle them
+def _hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_password(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a dedicated process pool so the
+    event loop is never blocked by password work.
+    At most `max_concurrency` operations are in flight; callers that wait longer
+    than `queue_timeout` for a slot are rejected with a 503. It defaults to the
+    number of workers: anything above that waits inside the process pool, where
+    it is neither counted in the queue depth nor timed out.
+    """
+
+    def __init__(self, workers: Optional[int], max_concurrency: Optional[int], queue_timeout: float):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_concurrency = max_concurrency or self.workers
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # Stats
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.rejected = 0
+        self._latency: Dict[str, Dict[str, float]] = {
+            "hash": {"count": 0, "total": 0.0, "max": 0.0},
+            "verify": {"count": 0, "total": 0.0, "max": 0.0},
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn instead of fork: forking a process that runs an event loop and DB pools is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def _run(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        self.queue_depth += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            logger.warning(f"Password {operation} rejected after waiting {self.queue_timeout}s (queue depth {self.queue_depth})")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy. Please try again shortly.",
+                headers={"Retry-After": "1"}
+            )
+        finally:
+            self.queue_depth -= 1
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.in_flight -= 1
+            self._semaphore.release()
+
+            latency = self._latency[operation]
+            latency["count"] += 1
+            latency["total"] += elapsed
+            latency["max"] = max(latency["max"], elapsed)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", _hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run("verify", _verify_password, password, hashed_password)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "latency_ms": {
+                operation: {
+                    "count": int(latency["count"]),
+                    "avg": round(latency["total"] / latency["count"] * 1000, 2) if latency["count"] else 0.0,
+                    "max": round(latency["max"] * 1000, 2),
+                }
+                for operation, latency in self._latency.items()
+            },
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_concurrency=settings.password_hash_max_concurrency,
+    queue_timeout=settings.password_hash_queue_timeout_seconds
+)
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Runs an async job every `interval` seconds in the background, or sooner when
+    woken. Errors are logged and the job is retried on the next tick.
+    """
+
+    def __init__(self, name: str, interval: float, job: Callable[[], Awaitable[object]], run_immediately: bool = False):
+        self.name = name
+        self.interval = interval
+        self.job = job
+        self.run_immediately = run_immediately
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        """Run the job now instead of at the next tick (or right after the current run)."""
+        self._wakeup.set()
+
+    async def _sleep(self):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self):
+        if not self.run_immediately:
+            await self._sleep()
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Periodic task {self.name} failed: {str(e)}", exc_info=True)
+            await self._sleep()
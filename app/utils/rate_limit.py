@@ -0,0 +1,158 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Optional, Protocol, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from app.config import settings
+
+
+class RateLimitBackend(Protocol):
+    async def consume(self, key: str, rate: float, burst: int) -> float:
+        """
+        Take one token from the bucket `key`, refilled at `rate` tokens/second up to `burst`.
+        Returns 0 if the request is allowed, otherwise the seconds until a token is available.
+        """
+        ...
+
+    async def close(self):
+        ...
+
+
+class InMemoryRateLimitBackend:
+    """Token buckets in this process. Limits are per worker; use the redis backend to share them."""
+
+    def __init__(self, max_buckets: int):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def consume(self, key: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (float(burst), now))
+        tokens = min(float(burst), tokens + (now - updated_at) * rate)
+
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+
+        # Most recently used last; evict the oldest buckets (they would be nearly full anyway)
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+        return wait
+
+    async def close(self):
+        self._buckets.clear()
+
+
+class RedisRateLimitBackend:
+    """
+    Token buckets stored in Redis and updated atomically by a Lua script, so all
+    workers share the same limits. Requires the optional `redis` package.
+    """
+
+    SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("rate_limit_backend=redis requires the 'redis' package") from e
+
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    async def consume(self, key: str, rate: float, burst: int) -> float:
+        return float(await self._script(keys=[f"ratelimit:{key}"], args=[rate, burst]))
+
+    async def close(self):
+        await self._client.aclose()
+
+
+class RateLimiter:
+    """Front for the configured backend; rejects over-limit requests with a 429."""
+
+    def __init__(self):
+        self._backend: Optional[RateLimitBackend] = None
+
+    @property
+    def backend(self) -> RateLimitBackend:
+        # Created on first use so importing the app never opens connections
+        if self._backend is None:
+            if settings.rate_limit_backend == "redis":
+                self._backend = RedisRateLimitBackend(settings.rate_limit_redis_url)
+            else:
+                self._backend = InMemoryRateLimitBackend(settings.rate_limit_max_buckets)
+        return self._backend
+
+    async def check(self, key: str, per_minute: float, burst: int):
+        wait = await self.backend.consume(key, per_minute / 60, burst)
+        if wait > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests. Please slow down.",
+                headers={"Retry-After": str(math.ceil(wait))}
+            )
+
+    async def close(self):
+        if self._backend is not None:
+            await self._backend.close()
+            self._backend = None
+
+rate_limiter = RateLimiter()
+
+def get_client_ip(request: Request) -> str:
+    """
+    The client address as seen by the outermost trusted proxy. Each proxy appends
+    the address it received from, so only the last `rate_limit_trusted_proxy_hops`
+    X-Forwarded-For entries are trustworthy; anything further left is whatever the
+    client chose to send and would let it pick a fresh rate-limit bucket per request.
+    """
+    if settings.rate_limit_trust_forwarded_for:
+        forwarded_for = [
+            entry.strip() for entry in request.headers.get("x-forwarded-for", "").split(",") if entry.strip()
+        ]
+        hops = settings.rate_limit_trusted_proxy_hops
+        if hops > 0 and len(forwarded_for) >= hops:
+            return forwarded_for[-hops]
+    return request.client.host if request.client else "unknown"
+
+async def limit_feedback_submission(request: Request, username: str):
+    """
+    Dependency for POST /u/{username}: token buckets per client IP and per recipient.
+    Runs before the handler touches the database, so rejections stay cheap.
+    """
+    if not settings.rate_limit_enabled:
+        return
+
+    await rate_limiter.check(
+        f"feedback:ip:{get_client_ip(request)}",
+        settings.feedback_rate_limit_per_ip_per_minute,
+        settings.feedback_rate_limit_per_ip_burst
+    )
+    await rate_limiter.check(
+        f"feedback:recipient:{username.lower()}",
+        settings.feedback_rate_limit_per_recipient_per_minute,
+        settings.feedback_rate_limit_per_recipient_burst
+    )
@@ -0,0 +1,46 @@
+import math
+
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import CURRENT_LSN_SQL, parse_lsn, read_session, replicas
+from app.utils.periodic import PeriodicTask
+
+# Carries the primary's WAL position after the client's last write. It travels with
+# the client, so every worker honours it; reads go only to replicas that have replayed
+# that far, or to the primary
+READ_AFTER_COOKIE = "read_after_lsn"
+
+async def remember_write(db: AsyncSession, response: Response):
+    """Call after committing a user's own write, so that client's next reads include it."""
+    if not replicas.engines:
+        return
+    lsn = (await db.execute(CURRENT_LSN_SQL)).scalar()
+    response.set_cookie(
+        key=READ_AFTER_COOKIE,
+        value=lsn,
+        httponly=True,
+        secure=True,
+        samesite="lax",
+        max_age=math.ceil(settings.read_your_writes_seconds)
+    )
+
+async def get_read_db(request: Request):
+    """
+    Session for read-only endpoints: a healthy replica when any are configured,
+    otherwise the primary. A client that wrote within read_your_writes_seconds
+    only reads from replicas that have replayed its write.
+    """
+    async with read_session(min_lsn=parse_lsn(request.cookies.get(READ_AFTER_COOKIE))) as db:
+        yield db
+
+replica_health_checker = PeriodicTask(
+    "replica-health-check",
+    interval=settings.db_replica_health_check_interval_seconds,
+    job=lambda: replicas.check(
+        max_lag=settings.db_replica_max_lag_seconds,
+        timeout=settings.db_replica_health_check_interval_seconds
+    ),
+    run_immediately=True
+)
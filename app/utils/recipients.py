@@ -0,0 +1,114 @@
+import uuid
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import exists, func, select, insert, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.model import User, Message, utcnow_naive
+from app.utils.cache import TTLCache
+from app.utils.duplicates import DuplicateMessage, content_fingerprint, duplicate_window_start
+from app.utils.message_counts import adjust_message_count
+
+
+class Recipient(NamedTuple):
+    id: uuid.UUID
+    is_verified: bool
+    is_accepting_messages: bool
+
+class NewMessage(NamedTuple):
+    id: uuid.UUID
+    recipient_id: uuid.UUID
+    content: str
+    created_at: datetime
+
+# username -> Recipient, only for recipients that can receive messages: invalidation reaches just this
+# worker, so a cached rejection would keep refusing feedback elsewhere after the user verified or
+# reopened their inbox, while a stale acceptance is caught by insert_message's re-check.
+# Invalidate whenever is_verified or is_accepting_messages changes
+recipient_cache: TTLCache[Recipient] = TTLCache(
+    max_size=settings.recipient_cache_max_size,
+    ttl=settings.recipient_cache_ttl_seconds
+)
+
+async def resolve_recipient(db: AsyncSession, username: str) -> Optional[Recipient]:
+    """Look up the fields needed to accept feedback for `username`, cache first for recipients that accept it."""
+    recipient = recipient_cache.get(username)
+    if recipient is not None:
+        return recipient
+
+    row = (await db.execute(
+        select(User.id, User.is_verified, User.is_accepting_messages).where(User.username == username)
+    )).first()
+    if row is None:
+        return None
+
+    recipient = Recipient(*row)
+    if recipient.is_verified and recipient.is_accepting_messages:
+        recipient_cache.set(username, recipient)
+    return recipient
+
+async def insert_message(db: AsyncSession, recipient_id: uuid.UUID, content: str) -> Optional[NewMessage]:
+    """
+    Insert a message and bump the recipient's counter in a single statement:
+
+        WITH duplicate AS (
+            SELECT id FROM messages
+            WHERE recipient_id = :recipient_id AND content_hash = :hash AND created_at >= :since LIMIT 1
+        ), inserted AS (
+            INSERT INTO messages (...) SELECT ... FROM users
+            WHERE id = :recipient_id AND is_verified AND is_accepting_messages
+              AND NOT EXISTS (SELECT * FROM duplicate)
+            RETURNING recipient_id
+        ), counted AS (
+            UPDATE users SET message_count = message_count + 1 FROM inserted
+            WHERE users.id = inserted.recipient_id RETURNING users.id
+        )
+        SELECT (SELECT count(*) FROM counted), EXISTS (SELECT * FROM duplicate)
+
+    The WHERE clause re-validates the recipient, so stale cached state can never
+    store a message. The duplicate CTE is one probe of ix_messages_recipient_id_content_hash,
+    shared by the insert and the result; it is left out when the duplicate window is disabled.
+    Returns None if nothing was inserted; raises DuplicateMessage for a duplicate.
+    """
+    message = NewMessage(uuid.uuid4(), recipient_id, content, utcnow_naive())
+    content_hash = content_fingerprint(content)
+
+    conditions = [User.id == recipient_id, User.is_verified, User.is_accepting_messages]
+    since = duplicate_window_start()
+    if since is not None:
+        duplicate = (
+            select(Message.id)
+            .where(Message.recipient_id == recipient_id, Message.content_hash == content_hash, Message.created_at >= since)
+            .limit(1)
+            .cte("duplicate")
+        )
+        conditions.append(~exists(duplicate.select()))
+
+    inserted = (
+        insert(Message)
+        .from_select(
+            ["id", "recipient_id", "content", "created_at", "content_hash"],
+            select(
+                literal(message.id, Message.id.type),
+                User.id,
+                literal(message.content, Message.content.type),
+                literal(message.created_at, Message.created_at.type),
+                literal(content_hash, Message.content_hash.type)
+            ).where(*conditions)
+        )
+        .returning(Message.recipient_id)
+        .cte("inserted")
+    )
+    counted = adjust_message_count(inserted.c.recipient_id, 1).returning(User.id).cte("counted")
+
+    stored, is_duplicate = (await db.execute(select(
+        select(func.count()).select_from(counted).scalar_subquery(),
+        exists(duplicate.select()) if since is not None else literal(False)
+    ))).one()
+    if stored:
+        return message
+    if is_duplicate:
+        raise DuplicateMessage()
+    return None
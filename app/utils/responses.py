@@ -0,0 +1,38 @@
+import json
+import uuid
+from datetime import datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value: Any) -> Any:
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode plain data (dicts, lists, UUIDs, datetimes) as compact JSON.
+    Uses orjson when it is installed and falls back to the standard library.
+    """
+    if orjson is not None:
+        # default= catches UUID subclasses (asyncpg returns its own), which orjson doesn't encode natively
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response for list endpoints that build their payload from column tuples.
+    Returning it skips FastAPI's response_model validation, so the content must
+    already match the documented schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
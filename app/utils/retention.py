@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import column, delete, func, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal, init_async_engine, set_maintenance_timeout
+from app.models.model import Message, utcnow_naive
+from app.utils.message_counts import apply_message_count_deltas
+from app.utils.periodic import PeriodicTask
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Monthly partitions of messages (when partitioned) are named messages_y2026m01, messages_y2026m02, ...
+PARTITION_NAME = re.compile(r"^messages_y(\d{4})m(\d{2})$")
+
+IS_PARTITIONED_SQL = text(
+    "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('messages'))"
+)
+# Partitions of messages, plus tables a purge detached but didn't get to drop (they still hold
+# messages that are on the owners' counters): name, whether attached, whether a detach is pending
+LIST_PARTITIONS_SQL = text(
+    "SELECT child.relname, pg_inherits.inhrelid IS NOT NULL, coalesce(pg_inherits.inhdetachpending, false) "
+    "FROM pg_class child "
+    "LEFT JOIN pg_inherits ON pg_inherits.inhrelid = child.oid AND pg_inherits.inhparent = to_regclass('messages') "
+    "WHERE child.relkind = 'r' "
+    "AND child.relnamespace = (SELECT relnamespace FROM pg_class WHERE oid = to_regclass('messages')) "
+    "AND (pg_inherits.inhrelid IS NOT NULL OR NOT child.relispartition)"
+)
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+def partition_name(month: datetime) -> str:
+    return f"messages_y{month.year:04d}m{month.month:02d}"
+
+def create_partition_sql(month: datetime, parent: str = "messages") -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {parent} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+def upcoming_months(months_ahead: int) -> List[datetime]:
+    """The current month and the next `months_ahead`; these partitions must exist before rows arrive."""
+    current = month_start(utcnow_naive())
+    return [add_months(current, offset) for offset in range(months_ahead + 1)]
+
+def parse_partitions(names: List[str]) -> List[Tuple[datetime, str]]:
+    """(month, name) for the monthly partitions among `names`, oldest first."""
+    months = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            months.append((datetime(int(match.group(1)), int(match.group(2)), 1), name))
+    return sorted(months)
+
+
+async def is_partitioned(db: AsyncSession) -> bool:
+    return bool((await db.execute(IS_PARTITIONED_SQL)).scalar())
+
+async def ensure_message_partitions(db: AsyncSession, months_ahead: int):
+    """Create any missing partitions for the coming months. Inserts fail if their month has none."""
+    for month in upcoming_months(months_ahead):
+        await db.execute(text(create_partition_sql(month)))
+
+async def detach_partition(name: str, pending: bool = False):
+    """
+    Detach a partition from messages without stalling traffic. A plain DETACH or DROP
+    needs an ACCESS EXCLUSIVE lock on messages itself, and while it waits for running
+    transactions every new read and write on messages queues behind it. DETACH ...
+    CONCURRENTLY only takes a SHARE UPDATE EXCLUSIVE lock and waits for those
+    transactions instead. It can't run inside a transaction block, so it gets its own
+    autocommit connection. `pending` finishes a detach that was interrupted.
+    """
+    async with init_async_engine().connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        # SET LOCAL has no effect outside a transaction; reset before the connection goes back to the pool
+        await conn.execute(text(f"SET statement_timeout = {int(settings.db_maintenance_statement_timeout_ms)}"))
+        try:
+            await conn.execute(text(
+                f"ALTER TABLE messages DETACH PARTITION {name} {'FINALIZE' if pending else 'CONCURRENTLY'}"
+            ))
+        finally:
+            await conn.execute(text("RESET statement_timeout"))
+
+async def drop_expired_partition(db: AsyncSession, name: str) -> int:
+    """
+    Drop one detached partition whose whole month is past retention, taking its
+    messages off the owners' counters in the same transaction. Returns the number of
+    messages dropped.
+
+    Once detached, no request can read or change the table, so the count can't
+    race a delete and the drop locks nothing that requests use.
+    """
+    await set_maintenance_timeout(db)
+
+    partition = table(name, column("recipient_id", Message.recipient_id.type))
+    counts = (await db.execute(
+        select(partition.c.recipient_id, func.count()).group_by(partition.c.recipient_id)
+    )).all()
+    await db.execute(text(f"DROP TABLE {name}"))
+
+    await apply_message_count_deltas(db, {user_id: -messages for user_id, messages in counts})
+    return sum(messages for _, messages in counts)
+
+async def delete_expired_batch(db: AsyncSession, cutoff: datetime, batch_size: int) -> int:
+    """Delete up to `batch_size` of the oldest messages created before `cutoff`. Returns the number deleted."""
+    await set_maintenance_timeout(db)
+    doomed = (
+        select(Message.id)
+        .where(Message.created_at < cutoff)
+        .order_by(Message.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    # created_at in the outer WHERE lets a partitioned table prune to the expired partitions
+    recipient_ids = (await db.execute(
+        delete(Message)
+        .where(Message.id.in_(doomed), Message.created_at < cutoff)
+        .returning(Message.recipient_id)
+        .execution_options(synchronize_session=False)
+    )).scalars().all()
+
+    await apply_message_count_deltas(db, {user_id: -count for user_id, count in Counter(recipient_ids).items()})
+    return len(recipient_ids)
+
+async def purge_expired_messages(retention_days: int, batch_size: int) -> int:
+    """
+    Remove messages older than the retention window. On a partitioned table, months
+    entirely past the cutoff are detached and dropped as whole partitions; whatever is left
+    (every row, if the table isn't partitioned) is deleted in small batches, one
+    transaction each. Returns the number of messages removed.
+    """
+    cutoff = utcnow_naive() - timedelta(days=retention_days)
+    purged = 0
+
+    async with AsyncSessionLocal() as db:
+        tables = (await db.execute(LIST_PARTITIONS_SQL)).all()
+    attached = {name: pending for name, is_attached, pending in tables if is_attached}
+
+    for month, name in parse_partitions([name for name, _, _ in tables]):
+        if add_months(month, 1) > cutoff:
+            break
+        if name in attached:
+            await detach_partition(name, pending=attached[name])
+        async with AsyncSessionLocal() as db:
+            dropped = await drop_expired_partition(db, name)
+            await db.commit()
+        logger.info(f"Dropped expired partition {name} ({dropped} messages)")
+        purged += dropped
+
+    while True:
+        async with AsyncSessionLocal() as db:
+            deleted = await delete_expired_batch(db, cutoff, batch_size)
+            await db.commit()
+        purged += deleted
+        if deleted < batch_size:
+            break
+        # Let request handlers in between batches
+        await asyncio.sleep(0)
+
+    if purged:
+        logger.info(f"Purged {purged} messages older than {retention_days} days")
+    return purged
+
+async def run_message_maintenance(retention_days: Optional[int], batch_size: int, months_ahead: int) -> int:
+    """Keep future partitions in place (if partitioned) and apply the retention policy (if set)."""
+    async with AsyncSessionLocal() as db:
+        if await is_partitioned(db):
+            await ensure_message_partitions(db, months_ahead)
+            await db.commit()
+
+    if retention_days is None:
+        return 0
+    return await purge_expired_messages(retention_days, batch_size)
+
+message_maintenance_task = PeriodicTask(
+    "message-maintenance",
+    interval=settings.message_retention_interval_seconds,
+    job=lambda: run_message_maintenance(
+        settings.message_retention_days,
+        settings.message_retention_batch_size,
+        settings.message_partition_premake_months
+    ),
+    run_immediately=True
+)
@@ -1,7 +1,42 @@
+import hashlib
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
 from jose import JWTError, jwt
 from app.config import settings
+from app.utils.cache import TTLCache
+
+# Payloads of already-verified tokens, keyed by SHA-256 of the token; each entry expires with its token
+access_token_cache: TTLCache[Dict[str, Any]] = TTLCache(max_size=settings.jwt_cache_max_size, ttl=0)
+refresh_token_cache: TTLCache[Dict[str, Any]] = TTLCache(max_size=settings.jwt_cache_max_size, ttl=0)
+
+def _decode_cached(cache: TTLCache[Dict[str, Any]], token: str, secret_key: str) -> Dict[str, Any]:
+    """
+    jwt.decode with a cache of verified payloads, so repeat requests with the same
+    token skip signature verification and JSON parsing.
+    Raises JWTError like jwt.decode. The returned payload is shared: treat it as read-only.
+    """
+    if not settings.jwt_cache_enabled:
+        return jwt.decode(token, secret_key, algorithms=[settings.algorithm])
+
+    key = hashlib.sha256(token.encode()).digest()
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    payload = jwt.decode(token, secret_key, algorithms=[settings.algorithm])
+
+    # Only cache tokens that carry an expiry, and never beyond it
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        remaining = exp - time.time()
+        if remaining > 0:
+            cache.set(key, payload, ttl=remaining)
+    return payload
+
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """Verify and decode an access token (cached). Raises JWTError if invalid or expired."""
+    return _decode_cached(access_token_cache, token, settings.secret_key)
 
 def create_verification_token(email: str) -> str:
     expire = datetime.now(timezone.utc) + timedelta(hours=settings.verification_token_expire_hours)
@@ -49,7 +84,7 @@ def verify_refresh_token(token: str) -> Optional[Dict[str, Any]]:
     Returns payload dict if valid, None if invalid/expired.
     """
     try:
-        payload = jwt.decode(token, settings.refresh_token_secret_key, algorithms=[settings.algorithm])
+        payload = _decode_cached(refresh_token_cache, token, settings.refresh_token_secret_key)
         if payload.get("type") != "refresh":
             return None
         return payload
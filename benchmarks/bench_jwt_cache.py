@@ -0,0 +1,73 @@
+"""
+Per-request auth overhead of get_current_user with the verified-JWT cache on and off.
+
+    python -m benchmarks.bench_jwt_cache [--requests 20000]
+
+Runs the real dependency in-process with a warm user cache, so the numbers
+are the pure token-handling cost; no database is needed.
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+# Settings need values even though nothing here talks to the DB or SMTP
+for name, value in {
+    "DATABASE_HOSTNAME": "localhost", "DATABASE_PORT": "5432", "DATABASE_PASSWORD": "bench",
+    "DATABASE_NAME": "bench", "DATABASE_USERNAME": "bench", "SECRET_KEY": "bench-secret",
+    "ALGORITHM": "HS256", "ACCESS_TOKEN_EXPIRE_MINUTES": "30", "REFRESH_TOKEN_SECRET_KEY": "bench-refresh",
+    "REFRESH_TOKEN_EXPIRE_DAYS": "7", "VERIFICATION_TOKEN_EXPIRE_HOURS": "24",
+    "PASSWORD_RESET_TOKEN_EXPIRE_HOURS": "1", "RESEND_API_KEY": "bench", "MAIL_FROM": "example.com",
+    "MAIL_FROM_NAME": "Bench", "FRONTEND_URL": "http://localhost", "BACKEND_URL": "http://localhost",
+}.items():
+    os.environ.setdefault(name, value)
+
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.config import settings
+from app.models.model import User
+from app.utils.auth import get_current_user, user_cache
+from app.utils.tokens import create_access_token, access_token_cache
+
+
+async def measure(requests: int, cache_enabled: bool) -> float:
+    settings.jwt_cache_enabled = cache_enabled
+    access_token_cache.clear()
+
+    user = User(id=uuid.uuid4(), username="bench", email="bench@example.com", is_verified=True)
+    token = create_access_token(data={"sub": user.email, "user_id": str(user.id)})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    async with AsyncSession() as db:
+        # Warm the user cache with a detached instance so no query is ever issued
+        make_transient_to_detached(user)
+        user_cache.set(str(user.id), user)
+
+        await get_current_user(credentials, db)
+        started = time.perf_counter()
+        for _ in range(requests):
+            await get_current_user(credentials, db)
+            db.expunge_all()
+        elapsed = time.perf_counter() - started
+
+    return elapsed / requests * 1_000_000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    off = await measure(args.requests, cache_enabled=False)
+    on = await measure(args.requests, cache_enabled=True)
+
+    print(f"get_current_user, {args.requests} requests with the same bearer token")
+    print(f"  jwt cache off: {off:8.1f} us/request")
+    print(f"  jwt cache on:  {on:8.1f} us/request  ({off / on:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""
+How long feedback traffic stalls while retention drops an expired partition.
+
+    python -m benchmarks.bench_partition_drop [--messages 50000] [--reader-seconds 3]
+
+Creates a throwaway user with --messages messages in a partition far in the past,
+then runs purge_expired_messages while, at the same time:
+
+  * a long transaction reads messages through the parent (a slow inbox read), and
+  * a probe reads and inserts messages through the parent every 50ms, like requests.
+
+Reports the slowest probe and checks that the partition is gone and the user's
+message_count is back to its real value. Exits non-zero if a probe stalled past
+--max-stall or the counter is off.
+
+Needs the Postgres database from the app settings (.env) with the partitioned
+schema applied (python -m app.migrate).
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, text
+
+from app.config import settings
+from app.database import AsyncSessionLocal, dispose_engines, init_async_engine
+from app.models.model import Message, User, utcnow_naive
+from app.utils.retention import create_partition_sql, is_partitioned, partition_name, purge_expired_messages
+
+# Old enough that no real data lives there
+EXPIRED_MONTH = datetime(2001, 1, 1)
+PROBE_INTERVAL = 0.05
+
+async def create_fixture(messages: int) -> uuid.UUID:
+    user_id = uuid.uuid4()
+    async with AsyncSessionLocal() as db:
+        if not await is_partitioned(db):
+            sys.exit("messages is not partitioned; run python -m app.migrate first")
+        await db.execute(text(create_partition_sql(EXPIRED_MONTH)))
+        await db.execute(insert(User).values(
+            id=user_id, username=f"partition_drop_{user_id.hex[:8]}", email=f"{user_id.hex[:8]}@example.com",
+            password="-", is_verified=True, is_accepting_messages=True, message_count=messages
+        ))
+        await db.execute(text(
+            "INSERT INTO messages (id, recipient_id, content, created_at) "
+            "SELECT gen_random_uuid(), :user_id, 'expired ' || n, CAST(:month AS timestamp) + (n % 86400) * interval '1 second' "
+            "FROM generate_series(1, :messages) AS n"
+        ), {"user_id": user_id, "month": EXPIRED_MONTH, "messages": messages})
+        await db.commit()
+    return user_id
+
+async def long_reader(user_id: uuid.UUID, seconds: float, started: asyncio.Event):
+    async with AsyncSessionLocal() as db:
+        await db.execute(select(func.count()).select_from(Message).where(Message.recipient_id == user_id))
+        started.set()
+        await asyncio.sleep(seconds)
+        await db.commit()
+
+async def probe(user_id: uuid.UUID, stop: asyncio.Event) -> float:
+    slowest = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                select(Message.id).where(Message.recipient_id == user_id)
+                .order_by(Message.created_at.desc()).limit(20)
+            )
+            await db.execute(insert(Message).values(recipient_id=user_id, content="probe", created_at=utcnow_naive()))
+            await db.execute(User.__table__.update().where(User.id == user_id).values(message_count=User.message_count + 1))
+            await db.commit()
+        slowest = max(slowest, time.perf_counter() - started)
+        await asyncio.sleep(PROBE_INTERVAL)
+    return slowest
+
+async def run(messages: int, reader_seconds: float, max_stall: float) -> bool:
+    init_async_engine()
+    user_id = await create_fixture(messages)
+    try:
+        reader_started, stop = asyncio.Event(), asyncio.Event()
+        reader = asyncio.create_task(long_reader(user_id, reader_seconds, reader_started))
+        await reader_started.wait()
+        prober = asyncio.create_task(probe(user_id, stop))
+
+        # A cutoff just past the fixture month: only it is expired
+        retention_days = (utcnow_naive() - datetime(2001, 2, 2)).days
+        started = time.perf_counter()
+        purged = await purge_expired_messages(retention_days, settings.message_retention_batch_size)
+        purge_seconds = time.perf_counter() - started
+
+        await reader
+        stop.set()
+        slowest = await prober
+
+        async with AsyncSessionLocal() as db:
+            remaining = (await db.execute(
+                text("SELECT to_regclass(:name) IS NOT NULL"), {"name": partition_name(EXPIRED_MONTH)}
+            )).scalar()
+            counter = (await db.execute(select(User.message_count).where(User.id == user_id))).scalar()
+            actual = (await db.execute(
+                select(func.count()).select_from(Message).where(Message.recipient_id == user_id)
+            )).scalar()
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(User.__table__.delete().where(User.id == user_id))
+            await db.commit()
+        await dispose_engines()
+
+    print(f"Purged {purged:,} messages in {purge_seconds:.2f}s alongside a {reader_seconds:.1f}s parent reader")
+    print(f"Slowest probe: {slowest * 1000:.0f}ms")
+    print(f"Partition left behind: {remaining}; message_count {counter}, actual {actual}")
+    return purged == messages and not remaining and counter == actual and slowest <= max_stall
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--reader-seconds", type=float, default=3.0, help="how long the parent reader stays open")
+    parser.add_argument("--max-stall", type=float, default=0.5, help="slowest acceptable probe, in seconds")
+    args = parser.parse_args()
+
+    sys.exit(0 if asyncio.run(run(args.messages, args.reader_seconds, args.max_stall)) else 1)
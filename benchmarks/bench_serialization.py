@@ -0,0 +1,109 @@
+"""
+Cost of building a GET /messages payload for large result sets: ORM objects
+validated and serialized through the route's response_model (the previous path)
+vs column tuples rendered by FastJSONResponse (the current path).
+
+    python -m benchmarks.bench_serialization [--sizes 1000,10000,100000] [--repeat 5] [--no-orjson]
+
+Needs the Postgres database from the app settings (.env). The rows are inserted
+in a transaction that is rolled back at the end, so nothing is left behind.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import Awaitable, Callable, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from sqlalchemy import text, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import database
+from app.models.model import User, Message
+from app.routers.feedback import router
+from app.schemas.message_schema import MessagePage, MessageResponse
+from app.utils import responses
+from app.utils.responses import FastJSONResponse
+
+
+async def seed(db: AsyncSession, rows: int) -> uuid.UUID:
+    user = User(username=f"bench_{uuid.uuid4().hex[:8]}", email=f"{uuid.uuid4().hex[:8]}@bench.invalid",
+                password="x", is_verified=True)
+    db.add(user)
+    await db.flush()
+    await db.execute(text(
+        "INSERT INTO messages (id, recipient_id, content, created_at) "
+        "SELECT gen_random_uuid(), :user_id, 'Feedback message number ' || g || ', with a bit of text to it', "
+        "timezone('utc', now()) - g * interval '1 second' FROM generate_series(1, :rows) AS g"
+    ), {"user_id": user.id, "rows": rows})
+    return user.id
+
+def messages_route() -> APIRoute:
+    return next(route for route in router.routes if route.path == "/messages" and "GET" in route.methods)
+
+async def orm_path(db: AsyncSession, user_id: uuid.UUID, limit: int) -> bytes:
+    messages = (await db.execute(
+        select(Message).where(Message.recipient_id == user_id)
+        .order_by(Message.created_at.desc(), Message.id.desc()).limit(limit)
+    )).scalars().all()
+    page = MessagePage(items=[MessageResponse.model_validate(message) for message in messages], next_cursor=None)
+    content = await serialize_response(field=messages_route().response_field, response_content=page)
+    # Drop the loaded objects so every round starts from an empty identity map
+    db.expunge_all()
+    return JSONResponse(content).body
+
+async def tuple_path(db: AsyncSession, user_id: uuid.UUID, limit: int) -> bytes:
+    rows = (await db.execute(
+        select(Message.id, Message.content, Message.created_at).where(Message.recipient_id == user_id)
+        .order_by(Message.created_at.desc(), Message.id.desc()).limit(limit)
+    )).all()
+    return FastJSONResponse({
+        "items": [
+            {"id": message_id, "content": content, "created_at": created_at}
+            for message_id, content, created_at in rows
+        ],
+        "next_cursor": None
+    }).body
+
+async def measure(path: Callable[..., Awaitable[bytes]], db: AsyncSession, user_id: uuid.UUID, limit: int, repeat: int) -> float:
+    await path(db, user_id, limit)  # warm up
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await path(db, user_id, limit)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+async def main(sizes: List[int], repeat: int):
+    database.init_async_engine()
+    try:
+        async with database.AsyncSessionLocal() as db:
+            user_id = await seed(db, max(sizes))
+
+            # Both paths must produce the same document
+            assert MessagePage.model_validate_json(await orm_path(db, user_id, 10)) == \
+                MessagePage.model_validate_json(await tuple_path(db, user_id, 10))
+
+            print(f"encoder: {'orjson' if responses.orjson is not None else 'json (stdlib)'}")
+            print(f"{'rows':>8}  {'ORM + response_model':>20}  {'tuples + FastJSON':>18}  {'speedup':>7}")
+            for size in sizes:
+                before = await measure(orm_path, db, user_id, size, repeat)
+                after = await measure(tuple_path, db, user_id, size, repeat)
+                print(f"{size:>8}  {before * 1000:>17.1f} ms  {after * 1000:>15.1f} ms  {before / after:>6.1f}x")
+
+            await db.rollback()
+    finally:
+        await database.dispose_engines()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-orjson", action="store_true", help="measure the standard-library fallback")
+    args = parser.parse_args()
+
+    if args.no_orjson:
+        responses.orjson = None
+    asyncio.run(main([int(size) for size in args.sizes.split(",")], args.repeat))
@@ -0,0 +1,362 @@
+"""
+Scripted load scenarios against every auth and feedback route, reporting
+throughput and p50/p95/p99 latency as JSON that can be diffed in review.
+
+    python -m benchmarks.seed --reset                    # once
+    python -m benchmarks.load_test --base-url http://localhost:8000 --output results.json
+    python -m benchmarks.load_test --in-process --scenarios login_storm,inbox_read
+
+Scenarios log in as the users created by benchmarks.seed. --in-process runs the
+app inside this process through httpx's ASGI transport (no server needed, but
+the inbox stream scenario is skipped because that transport buffers responses).
+
+Start the server with RATE_LIMIT_ENABLED=false unless the rate limiter is what
+you want to measure; otherwise the submission flood mostly measures 429s.
+Scenarios that register or verify users read verification tokens straight from
+the database in the app settings, so run against a local database only.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.seed import BENCH_PASSWORD, WORDS, bench_email, bench_username, connect
+
+Operation = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+@dataclass
+class Context:
+    users: int
+    rng: random.Random
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex[:6])
+    tokens: Dict[int, Dict[str, str]] = field(default_factory=dict)
+    registered: List[str] = field(default_factory=list)
+
+    def random_user(self) -> int:
+        # bench_0 holds the large inbox; keep it out of the random picks
+        return self.rng.randrange(1, self.users)
+
+    async def login(self, client: httpx.AsyncClient, n: int) -> Dict[str, str]:
+        if n not in self.tokens:
+            response = await client.post("/auth/login", json={"identifier": bench_username(n), "password": BENCH_PASSWORD})
+            response.raise_for_status()
+            self.tokens[n] = response.json()
+        return self.tokens[n]
+
+    async def auth_headers(self, client: httpx.AsyncClient, n: int) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {(await self.login(client, n))['access_token']}"}
+
+
+# Each scenario prepares whatever it needs, then returns the operation to run repeatedly
+
+async def check_availability(ctx: Context, client: httpx.AsyncClient, requests: int) -> Operation:
+    async def operation(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        # Half taken names, half free ones
+        n = ctx.random_user() if i % 2 else ctx.users + i
+        if i % 4 < 2:
+            return await client.get("/auth/check-username", params={"username": bench_username(n)})
+        return await client.get("/auth/check-email", params={"email": bench_email(n)})
+    return operation
+
+async def registration_burst(ctx: Context, client: httpx.AsyncClient, requests: int) -> Operation:
+    async def operation(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        username = f"lt{ctx.run_id}_{i}"
+        response = await client.post("/auth/register", json={
+            "username": username, "email": f"{username}@example.com", "password": BENCH_PASSWORD
+        })
+        if response.status_code == 201:
+            ctx.registered.append(username)
+        return response
+    return operation
+
+async def resend_verification(ctx: Context, client: httpx.AsyncClient, requests: int) -> Operation:
+    await _ensure_registered(ctx, client, requests)
+
+    async def operation(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        username = ctx.registered[i % len(ctx.registered)]
+        return await client.post("/auth/resend-verification", json={"email": f"{username}@example.com"})
+    return operation
+
+async def verify_email(ctx: Context, client: httpx.AsyncClient, requests: int) -> Operation:
+    await _ensure_registered(ctx, client, requests)
+    conn = await connect()
+    try:
+        rows = await conn.fetch(
+            "SELECT verification_token FROM users WHERE username = ANY($1::text[]) AND NOT is_verified",
+            ctx.registered
+        )
+    finally:
+        await conn.close()
+    tokens = [row["verification_token"] for row in rows]
+
+    async def operation(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        # Tokens run out after the first pass; later requests measure the "already verified" path
+        return await client.get("/auth/verify-email", params={"token": tokens[i % len(tokens)]})
+    return operation
+
+async def login_storm(ctx: Context, client: httpx.AsyncClient, requests: int) -> Operation:
+    async def operation(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        identifier = bench_username(ctx.random_user()) if i % 2 else bench_email(ctx.random_user())
+        return await client.post("/auth/login", json={"identifier": identifier, "password": BENCH_PASSWORD})
+    return operation
+
+async def token_refresh(ctx: Context, client: httpx.AsyncClient, requests: int) -> Operation:
+    sessions = [await ctx.login(client, n) for n in range(1, min(ctx.users, 51))]
+
+    async def operation(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        # The cookie is Secure, so send it explicitly; plain-http clients would drop it
+        refresh_token = sessions[i % len(sessions)]["refresh_token"]
+        return await client.post("/auth/refresh", headers={"Cookie": f"refresh_token={refresh_token}"})
+    return operation
+
+async def logout(ctx: Context, client: httpx.AsyncClient, requests: int) -> Operation:
+    async def operation(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.post("/auth/logout")
+    return operation
+
+async def submission_flood(ctx: Context, client: httpx.AsyncClient, requests: int) -> Operation:
+    async def operation(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        content = " ".join(ctx.rng.choices(WORDS, k=ctx.rng.randint(4, 30)))
+        return await client.post(f"/u/{bench_username(ctx.random_user())}", json={"content": content})
+    return operation
+
+async def inbox_read(ctx: Context, client: httpx.AsyncClient, requests: int) -> Operation:
+    # Walks the large inbox page by page, starting over at the end
+    headers = await ctx.auth_headers(client, 0)
+    cursor: List[Optional[str]] = [None]
+
+    async def operation(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        params = {"limit": 100}
+        if cursor[0]:
+            params["cursor"] = cursor[0]
+        response = await client.get("/messages", headers=headers, params=params)
+        cursor[0] = response.json().get("next_cursor") if response.status_code == 200 else None
+        return response
+    return operation
+
+async def inbox_revalidate(ctx: Context, client: httpx.AsyncClient, requests: int) -> Operation:
+    # A dashboard refresh of an unchanged inbox: If-None-Match answered with 304
+    headers = await ctx.auth_headers(client, 0)
+    etags = {
+        path: (await client.get(path, headers=headers)).headers.get("etag", "")
+        for path in ("/messages", "/messages/count")
+    }
+
+    async def operation(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        path = "/messages" if i % 2 else "/messages/count"
+        return await client.get(path, headers={**headers, "If-None-Match": etags[path]})
+    return operation
+
+async def inbox_count(ctx: Context, client: httpx.AsyncClient, requests: int) -> Operation:
+    users = [ctx.random_user() for _ in range(20)]
+    headers = [await ctx.auth_headers(client, n) for n in users]
+
+    async def operation(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get("/messages/count", headers=headers[i % len(headers)])
+    return operation
+
+async def inbox_search(ctx: Context, client: httpx.AsyncClient, requests: int) -> Operation:
+    headers = await ctx.auth_headers(client, 0)
+
+    async def operation(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        q = " ".join(ctx.rng.sample(WORDS, k=1 + i % 3))
+        return await client.get("/messages/search", headers=headers, params={"q": q})
+    return operation
+
+async def inbox_export(ctx: Context, client: httpx.AsyncClient, requests: int) -> Operation:
+    users = [ctx.random_user() for _ in range(20)]
+    headers = [await ctx.auth_headers(client, n) for n in users]
+
+    async def operation(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        export_format = "csv" if i % 2 else "ndjson"
+        return await client.get("/messages/export", headers=headers[i % len(headers)], params={"format": export_format})
+    return operation
+
+async def inbox_stream(ctx: Context, client: httpx.AsyncClient, requests: int) -> Operation:
+    # Time to open an inbox stream and receive its first frame
+    headers = await ctx.auth_headers(client, 0)
+
+    async def operation(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        async with client.stream("GET", "/messages/stream", headers=headers) as response:
+            async for _ in response.aiter_bytes():
+                break
+        return response
+    return operation
+
+async def message_delete(ctx: Context, client: httpx.AsyncClient, requests: int) -> Operation:
+    # Deletes single messages, then bulk-deletes pages of ids, from random seeded inboxes
+    targets = []
+    for _ in range(200):
+        if len(targets) >= requests:
+            break
+        headers = await ctx.auth_headers(client, ctx.random_user())
+        items = (await client.get("/messages", headers=headers, params={"limit": 100})).json()["items"]
+        targets.extend((headers, item["id"]) for item in items)
+
+    async def operation(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        headers, message_id = targets[i % len(targets)]
+        if i % 2:
+            return await client.request("DELETE", "/messages", headers=headers, json={"ids": [message_id]})
+        return await client.delete(f"/messages/{message_id}", headers=headers)
+    return operation
+
+async def toggle_messages(ctx: Context, client: httpx.AsyncClient, requests: int) -> Operation:
+    users = [ctx.random_user() for _ in range(10)]
+    headers = [await ctx.auth_headers(client, n) for n in users]
+
+    async def operation(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        # Off/on in pairs per user, so every inbox ends up accepting again
+        return await client.patch(
+            "/toggle-messages",
+            headers=headers[(i // 2) % len(headers)],
+            json={"is_accepting_messages": i % 2 == 1}
+        )
+    return operation
+
+async def _ensure_registered(ctx: Context, client: httpx.AsyncClient, requests: int):
+    if not ctx.registered:
+        register = await registration_burst(ctx, client, requests)
+        for i in range(min(requests, 50)):
+            await register(client, i)
+
+SCENARIOS: Dict[str, Callable[[Context, httpx.AsyncClient, int], Awaitable[Operation]]] = {
+    "check_availability": check_availability,
+    "registration_burst": registration_burst,
+    "resend_verification": resend_verification,
+    "verify_email": verify_email,
+    "login_storm": login_storm,
+    "token_refresh": token_refresh,
+    "logout": logout,
+    "submission_flood": submission_flood,
+    "inbox_read": inbox_read,
+    "inbox_revalidate": inbox_revalidate,
+    "inbox_count": inbox_count,
+    "inbox_search": inbox_search,
+    "inbox_export": inbox_export,
+    "inbox_stream": inbox_stream,
+    "message_delete": message_delete,
+    "toggle_messages": toggle_messages,
+}
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+async def run_scenario(name: str, ctx: Context, client: httpx.AsyncClient, requests: int, concurrency: int) -> Dict:
+    operation = await SCENARIOS[name](ctx, client, requests)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    next_index = iter(range(requests))
+
+    async def worker():
+        for i in next_index:
+            started = time.perf_counter()
+            try:
+                response = await operation(client, i)
+                statuses[str(response.status_code)] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "status_codes": dict(sorted(statuses.items())),
+        "duration_seconds": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 1),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 2),
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2),
+        },
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def main(args: argparse.Namespace):
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    if args.in_process and "inbox_stream" in names:
+        print("Skipping inbox_stream: the in-process transport cannot stream responses")
+        names.remove("inbox_stream")
+
+    ctx = Context(users=args.users, rng=random.Random(args.seed))
+    results = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "target": "in-process" if args.in_process else args.base_url,
+            "requests_per_scenario": args.requests,
+            "concurrency": args.concurrency,
+            "seeded_users": args.users,
+            "python": platform.python_version(),
+        },
+        "scenarios": {},
+    }
+
+    async def run_all(client: httpx.AsyncClient):
+        for name in names:
+            result = await run_scenario(name, ctx, client, args.requests, args.concurrency)
+            results["scenarios"][name] = result
+            latency = result["latency_ms"]
+            print(
+                f"{name:<20} {result['throughput_rps']:>8.1f} req/s  p50 {latency['p50']:>8.2f}ms  "
+                f"p95 {latency['p95']:>8.2f}ms  p99 {latency['p99']:>8.2f}ms  {result['status_codes']}"
+            )
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    if args.in_process:
+        from app.app import app
+
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout) as client:
+                await run_all(client)
+    else:
+        async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+            await run_all(client)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Wrote {args.output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--in-process", action="store_true", help="run the app in this process instead of calling a server")
+    parser.add_argument("--scenarios", help=f"comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=10_000, help="number of users created by benchmarks.seed")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", default="load_test_results.json")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,127 @@
+"""
+Bulk-load synthetic users and messages for benchmarks and load tests.
+
+    python -m benchmarks.seed --users 100000 --messages 2000000 [--large-inbox 100000] [--reset]
+
+Every seeded user is verified, accepts messages, is named bench_<n> and has the
+password BENCH_PASSWORD; the bcrypt hash is computed once and shared, so seeding
+costs no hashing. bench_0 additionally receives --large-inbox messages for the
+large-inbox read scenarios. Rows are streamed with COPY in chunks, so millions
+of rows load in minutes with flat memory.
+
+Needs the Postgres database from the app settings (.env) with the schema applied
+(python -m app.migrate). The app relies on Postgres-only features (tsvector,
+SKIP LOCKED, LISTEN/NOTIFY), so there is no SQLite stand-in.
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Tuple
+
+import asyncpg
+
+from app.config import settings
+from app.utils.duplicates import content_fingerprint
+from app.utils.password import pwd_context
+
+BENCH_PASSWORD = "bench-password"
+BENCH_PREFIX = "bench_"
+COPY_CHUNK_SIZE = 100_000
+
+# Enough variety for full-text search scenarios to have selective and common terms
+WORDS = (
+    "great meeting feedback team manager project deadline review code design communication "
+    "helpful clear slow fast kind rude late early honest support ideas presentation coffee "
+    "office remote schedule planning release quality testing documentation mentoring"
+).split()
+
+USER_COLUMNS = [
+    "id", "username", "email", "password", "is_verified", "is_accepting_messages",
+    "message_count", "inbox_version", "inbox_updated_at", "created_at", "updated_at",
+]
+MESSAGE_COLUMNS = ["id", "recipient_id", "content", "created_at", "content_hash"]
+
+def bench_username(n: int) -> str:
+    return f"{BENCH_PREFIX}{n}"
+
+def bench_email(n: int) -> str:
+    return f"{bench_username(n)}@example.com"
+
+async def connect() -> asyncpg.Connection:
+    return await asyncpg.connect(
+        host=settings.database_hostname,
+        port=settings.database_port,
+        user=settings.database_username,
+        password=settings.database_password,
+        database=settings.database_name
+    )
+
+def user_rows(user_ids: List[uuid.UUID], password_hash: str) -> Iterator[Tuple]:
+    now = datetime.now(timezone.utc)
+    naive_now = now.replace(tzinfo=None)
+    for n, user_id in enumerate(user_ids):
+        # message_count is filled in after the messages are loaded
+        yield (user_id, bench_username(n), bench_email(n), password_hash, True, True, 0, 0, naive_now, naive_now, now)
+
+def message_rows(rng: random.Random, user_ids: List[uuid.UUID], count: int, large_inbox: int) -> Iterator[Tuple]:
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    for n in range(count + large_inbox):
+        recipient_id = user_ids[0] if n < large_inbox else rng.choice(user_ids)
+        content = " ".join(rng.choices(WORDS, k=rng.randint(4, 30)))
+        created_at = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        yield (uuid.UUID(int=rng.getrandbits(128), version=4), recipient_id, content, created_at, content_fingerprint(content))
+
+async def copy_in_chunks(conn: asyncpg.Connection, table: str, columns: List[str], rows: Iterator[Tuple]) -> int:
+    total = 0
+    while True:
+        chunk = [row for _, row in zip(range(COPY_CHUNK_SIZE), rows)]
+        if not chunk:
+            return total
+        await conn.copy_records_to_table(table, records=chunk, columns=columns)
+        total += len(chunk)
+        print(f"  {table}: {total:,} rows", end="\r", flush=True)
+
+async def seed(users: int, messages: int, large_inbox: int, reset: bool, seed_value: int):
+    rng = random.Random(seed_value)
+    password_hash = pwd_context.hash(BENCH_PASSWORD)
+    conn = await connect()
+    try:
+        if reset:
+            # messages go with their recipient (ON DELETE CASCADE)
+            deleted = await conn.execute("DELETE FROM users WHERE starts_with(username, $1)", BENCH_PREFIX)
+            print(f"Removed previous bench users ({deleted})")
+
+        started = time.perf_counter()
+        user_ids = [uuid.UUID(int=rng.getrandbits(128), version=4) for _ in range(users)]
+        async with conn.transaction():
+            await copy_in_chunks(conn, "users", USER_COLUMNS, user_rows(user_ids, password_hash))
+            print()
+            await copy_in_chunks(conn, "messages", MESSAGE_COLUMNS, message_rows(rng, user_ids, messages, large_inbox))
+            print()
+            await conn.execute("""
+                UPDATE users SET message_count = counts.n
+                FROM (SELECT recipient_id, count(*) AS n FROM messages GROUP BY recipient_id) AS counts
+                WHERE counts.recipient_id = users.id AND starts_with(users.username, $1)
+            """, BENCH_PREFIX)
+        await conn.execute("ANALYZE users")
+        await conn.execute("ANALYZE messages")
+
+        elapsed = time.perf_counter() - started
+        total = users + messages + large_inbox
+        print(f"Seeded {users:,} users and {messages + large_inbox:,} messages in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+    finally:
+        await conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--messages", type=int, default=200_000, help="spread uniformly over all users")
+    parser.add_argument("--large-inbox", type=int, default=20_000, help="extra messages for bench_0")
+    parser.add_argument("--reset", action="store_true", help="delete existing bench_ users first")
+    parser.add_argument("--seed", type=int, default=42, help="random seed, for reproducible data")
+    args = parser.parse_args()
+
+    asyncio.run(seed(args.users, args.messages, args.large_inbox, args.reset, args.seed))